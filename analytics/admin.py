@@ -1,3 +1,13 @@
 from django.contrib import admin
+from .models import Event, RollupState
 
-# Register your models here.
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'content_type', 'object_id', 'visitor_id', 'occurred_at']
+    list_filter = ['event_type', 'content_type']
+
+
+@admin.register(RollupState)
+class RollupStateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_event_id', 'updated_at']
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from analytics.ingest import drain_events
+from analytics.rollup import rollup_events
+
+
+class Command(BaseCommand):
+    help = 'Aggregate engagement events into brand and blog stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-prune', action='store_true',
+            help='Keep raw events older than ANALYTICS_RETENTION_DAYS'
+        )
+
+    def handle(self, *args, **options):
+        drain_events()
+        summary = rollup_events(prune=not options['no_prune'])
+        brands, new_brands = summary['brand']
+        posts, new_posts = summary['blog']
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {summary['events']} events into {brands} brand stats "
+            f"({new_brands} new) and {posts} blog stats ({new_posts} new); "
+            f"pruned {summary['pruned']} old events"
+        ))
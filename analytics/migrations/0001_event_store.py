@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(choices=[('brand', 'Brand'), ('blog', 'Blog Post'), ('insight', 'Insight')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('event_type', models.CharField(choices=[('view', 'View'), ('like', 'Like'), ('share', 'Share')], max_length=10)),
+                ('visitor_id', models.CharField(blank=True, help_text='Anonymous visitor identifier', max_length=64)),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['occurred_at'], name='analytics_e_occurre_cf6407_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_event_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitorSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(choices=[('brand', 'Brand'), ('blog', 'Blog Post'), ('insight', 'Insight')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('bucket', models.CharField(help_text="ISO date or 'all'", max_length=10)),
+                ('registers', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('content_type', 'object_id', 'bucket')},
+            },
+        ),
+    ]
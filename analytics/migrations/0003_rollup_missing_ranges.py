@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_visitor_sketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupstate',
+            name='missing_ranges',
+            field=models.JSONField(blank=True, default=list, help_text='[first, last, missed_at] runs of event ids below the watermark not yet committed at the last run'),
+        ),
+    ]
@@ -1,3 +1,70 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Event(models.Model):
+    """Append-only engagement event recorded by the beacon endpoint."""
+    
+    CONTENT_TYPES = [
+        ('brand', 'Brand'),
+        ('blog', 'Blog Post'),
+        ('insight', 'Insight'),
+    ]
+    
+    EVENT_TYPES = [
+        ('view', 'View'),
+        ('like', 'Like'),
+        ('share', 'Share'),
+    ]
+    
+    content_type = models.CharField(max_length=10, choices=CONTENT_TYPES)
+    object_id = models.PositiveBigIntegerField()
+    event_type = models.CharField(max_length=10, choices=EVENT_TYPES)
+    visitor_id = models.CharField(max_length=64, blank=True, help_text="Anonymous visitor identifier")
+    occurred_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        # Only the pk and the time index, to keep inserts cheap. Rollups read
+        # new events by pk and rolling windows by time.
+        indexes = [
+            models.Index(fields=['occurred_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} {self.content_type}:{self.object_id} at {self.occurred_at}"
+
+
+class RollupState(models.Model):
+    """Watermark of the last event folded into the running totals, or drained from a spool."""
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.PositiveBigIntegerField(default=0)
+    missing_ranges = models.JSONField(
+        default=list, blank=True,
+        help_text="[first, last, missed_at] runs of event ids below the watermark not yet committed at the last run"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_event_id}"
+
+
+class VisitorSketch(models.Model):
+    """HyperLogLog sketch of the distinct visitors who viewed one object.
+    
+    There is one sketch per day plus an all-time sketch (bucket "all"); day
+    sketches are kept for the retention period and merged for weekly or
+    monthly uniques.
+    """
+    ALL_TIME = 'all'
+    
+    content_type = models.CharField(max_length=10, choices=Event.CONTENT_TYPES)
+    object_id = models.PositiveBigIntegerField()
+    bucket = models.CharField(max_length=10, help_text="ISO date or 'all'")
+    registers = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['content_type', 'object_id', 'bucket']
+    
+    def __str__(self):
+        return f"{self.content_type}:{self.object_id} ({self.bucket})"
@@ -0,0 +1,170 @@
+"""
+Roll raw engagement events up into BrandStats and BlogStats.
+
+Running totals grow incrementally: each run folds in only the events added
+since the stored watermark. Ids below the watermark that were not yet
+visible, because the transaction inserting them had not committed, are
+remembered and picked up by a later run, so late commits are not skipped.
+The daily, weekly and monthly view windows are recomputed from the retained
+events in one grouped query, so they decay as events age out. New views also feed the HyperLogLog visitor sketches that
+BlogStats.unique_views is estimated from, and the trending scores on brands,
+posts and insights. Insight events are stored but have no stats model yet.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from blog.models import BlogComment, BlogStats
+from brands.models import BrandStats
+from core.queries import consistent_read, count_by
+
+from .models import Event, RollupState
+from .sketches import all_time_uniques, prune_day_sketches
+from . import sketches, trending
+
+
+ROLLUP_NAME = 'stats'
+
+# content_type -> (stats model, foreign key attribute)
+STATS_TARGETS = {
+    'brand': (BrandStats, 'brand_id'),
+    'blog': (BlogStats, 'post_id'),
+}
+
+TOTAL_FIELDS = {
+    'view': 'total_views',
+    'like': 'total_likes',
+    'share': 'total_shares',
+}
+
+WINDOW_FIELDS = ['daily_views', 'weekly_views', 'monthly_views']
+
+# Missing event ids still absent after this long are taken to be rolled back
+MISSING_EVENT_TIMEOUT = timedelta(minutes=10)
+
+
+def _engagement_rate(stats):
+    if not stats.total_views:
+        return Decimal('0.00')
+    rate = Decimal(stats.total_likes + stats.total_shares) * 100 / stats.total_views
+    return min(rate, Decimal('999.99')).quantize(Decimal('0.01'))
+
+
+def _missing_ranges(first, last, seen, missed_at):
+    """Split the ids first..last into the runs absent from seen (a sorted list)."""
+    ranges = []
+    start = first
+    for pk in seen[bisect_left(seen, first):bisect_right(seen, last)]:
+        if pk > start:
+            ranges.append([start, pk - 1, missed_at])
+        start = pk + 1
+    if start <= last:
+        ranges.append([start, last, missed_at])
+    return ranges
+
+
+def _event_counts(new_events, last_id, now):
+    """Get per-object total deltas and view windows."""
+    totals = {}
+    for content_type, object_id, event_type, n in new_events.order_by().values_list(
+        'content_type', 'object_id', 'event_type'
+    ).annotate(n=Count('pk')):
+        totals.setdefault((content_type, object_id), {})[event_type] = n
+    
+    windows = {}
+    recent_views = Event.objects.filter(
+        pk__lte=last_id, event_type='view', occurred_at__gte=now - timedelta(days=30)
+    ).order_by()
+    for content_type, object_id, daily, weekly, monthly in recent_views.values_list(
+        'content_type', 'object_id'
+    ).annotate(
+        daily=Count('pk', filter=Q(occurred_at__gte=now - timedelta(days=1))),
+        weekly=Count('pk', filter=Q(occurred_at__gte=now - timedelta(days=7))),
+        monthly=Count('pk'),
+    ):
+        windows[(content_type, object_id)] = (daily, weekly, monthly)
+    return totals, windows
+
+
+def _apply(content_type, totals, windows, now):
+    model, fk = STATS_TARGETS[content_type]
+    touched = {object_id for kind, object_id in list(totals) + list(windows) if kind == content_type}
+    # Rows with new events or views in the windows, and rows whose windows
+    # have just emptied
+    changed = Q(**{f'{fk}__in': touched})
+    for field in WINDOW_FIELDS:
+        changed |= Q(**{f'{field}__gt': 0})
+    if content_type == 'blog':
+        comments = count_by(BlogComment.objects.filter(is_approved=True), 'post')
+        uniques = all_time_uniques(content_type)
+        changed |= Q(**{f'{fk}__in': list(comments)}) | Q(total_comments__gt=0)
+    existing = {getattr(stats, fk): stats for stats in model.objects.filter(changed)}
+    
+    # Only create stats rows for objects that still exist
+    parent = model._meta.get_field(fk[:-3]).related_model
+    missing = touched - set(existing)
+    for object_id in parent.objects.filter(pk__in=missing).values_list('pk', flat=True):
+        existing[object_id] = model(**{fk: object_id})
+    
+    for object_id, stats in existing.items():
+        for event_type, n in totals.get((content_type, object_id), {}).items():
+            field = TOTAL_FIELDS[event_type]
+            setattr(stats, field, getattr(stats, field) + n)
+        for field, value in zip(WINDOW_FIELDS, windows.get((content_type, object_id), (0, 0, 0))):
+            setattr(stats, field, value)
+        if content_type == 'blog':
+            stats.total_comments = comments.get(object_id, 0)
+            stats.unique_views = uniques.get(object_id, stats.unique_views)
+        else:
+            stats.engagement_rate = _engagement_rate(stats)
+        stats.updated_at = now
+    
+    fields = list(TOTAL_FIELDS.values()) + WINDOW_FIELDS + ['updated_at']
+    fields += ['total_comments', 'unique_views'] if content_type == 'blog' else ['engagement_rate']
+    model.objects.bulk_update([s for s in existing.values() if s.pk], fields, batch_size=500)
+    created = model.objects.bulk_create([s for s in existing.values() if not s.pk], batch_size=500)
+    return len(existing), len(created)
+
+
+def rollup_events(prune=True, now=None):
+    """Fold new events into the stats tables and return a summary."""
+    now = now or timezone.now()
+    # One snapshot for every query, so each event is either counted and
+    # marked seen or left for a later run
+    with consistent_read():
+        state, _ = RollupState.objects.select_for_update().get_or_create(name=ROLLUP_NAME)
+        watermark = state.last_event_id
+        last_id = max(Event.objects.aggregate(last=Max('pk'))['last'] or 0, watermark)
+        new_ids = Q(pk__gt=watermark, pk__lte=last_id)
+        for first, last, missed_at in state.missing_ranges:
+            new_ids |= Q(pk__range=(first, last))
+        new_events = Event.objects.filter(new_ids)
+        totals, windows = _event_counts(new_events, last_id, now)
+        new_views = new_events.filter(event_type='view')
+        sketches.add_views(new_views.values_list('content_type', 'object_id', 'visitor_id', 'occurred_at').iterator())
+        trending.add_views(new_views.values_list('content_type', 'object_id', 'occurred_at').iterator())
+        
+        seen = list(new_events.order_by('pk').values_list('pk', flat=True).iterator())
+        summary = {'events': len(seen)}
+        for content_type in STATS_TARGETS:
+            summary[content_type] = _apply(content_type, totals, windows, now)
+        
+        expired = (now - MISSING_EVENT_TIMEOUT).isoformat()
+        missing = _missing_ranges(watermark + 1, last_id, seen, now.isoformat())
+        for first, last, missed_at in state.missing_ranges:
+            if missed_at >= expired:
+                missing += _missing_ranges(first, last, seen, missed_at)
+        state.last_event_id = last_id
+        state.missing_ranges = missing
+        state.save()
+        
+        summary['pruned'] = 0
+        if prune:
+            cutoff = now - timedelta(days=settings.ANALYTICS_RETENTION_DAYS)
+            summary['pruned'], _ = Event.objects.filter(pk__lte=last_id, occurred_at__lt=cutoff).delete()
+            prune_day_sketches(timezone.localdate(cutoff))
+    return summary
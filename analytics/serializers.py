@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+from .models import Event
+
+
+class EventSerializer(serializers.Serializer):
+    """Serializer for one beacon event."""
+    type = serializers.ChoiceField(choices=Event.EVENT_TYPES)
+    target = serializers.ChoiceField(choices=Event.CONTENT_TYPES)
+    id = serializers.IntegerField(min_value=1)
+    visitor = serializers.CharField(max_length=64, required=False, allow_blank=True, default='')
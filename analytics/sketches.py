@@ -0,0 +1,84 @@
+"""
+Unique-visitor sketches built from view events.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .hyperloglog import HyperLogLog
+from .models import VisitorSketch
+
+
+def add_views(views):
+    """Fold (content_type, object_id, visitor_id, occurred_at) rows into the sketches.
+
+    Each touched sketch is read and written once, however many views it gets.
+    """
+    visitors = defaultdict(set)
+    for content_type, object_id, visitor_id, occurred_at in views:
+        if not visitor_id:
+            continue
+        day = timezone.localdate(occurred_at).isoformat()
+        visitors[(content_type, object_id, day)].add(visitor_id)
+        visitors[(content_type, object_id, VisitorSketch.ALL_TIME)].add(visitor_id)
+    if not visitors:
+        return 0
+    
+    object_ids = {object_id for _, object_id, _ in visitors}
+    buckets = {bucket for _, _, bucket in visitors}
+    existing = {
+        (sketch.content_type, sketch.object_id, sketch.bucket): sketch
+        for sketch in VisitorSketch.objects.filter(object_id__in=object_ids, bucket__in=buckets)
+    }
+    
+    to_update, to_create = [], []
+    now = timezone.now()
+    for key, ids in visitors.items():
+        sketch = existing.get(key)
+        if sketch is None:
+            hll = HyperLogLog()
+            sketch = VisitorSketch(content_type=key[0], object_id=key[1], bucket=key[2])
+            to_create.append(sketch)
+        else:
+            hll = HyperLogLog.from_bytes(sketch.registers)
+            to_update.append(sketch)
+        hll.update(ids)
+        sketch.registers = hll.to_bytes()
+        sketch.updated_at = now
+    VisitorSketch.objects.bulk_update(to_update, ['registers', 'updated_at'], batch_size=200)
+    VisitorSketch.objects.bulk_create(to_create, batch_size=200)
+    return len(visitors)
+
+
+def unique_visitors(content_type, object_id, days=None):
+    """Estimate distinct visitors to one object, all time or over the last n days."""
+    sketches = VisitorSketch.objects.filter(content_type=content_type, object_id=object_id)
+    if days is None:
+        sketches = sketches.filter(bucket=VisitorSketch.ALL_TIME)
+    else:
+        today = timezone.localdate()
+        sketches = sketches.filter(
+            bucket__in=[(today - timedelta(days=n)).isoformat() for n in range(days)]
+        )
+    total = HyperLogLog()
+    for registers in sketches.values_list('registers', flat=True):
+        total.merge(HyperLogLog.from_bytes(registers))
+    return total.count()
+
+
+def all_time_uniques(content_type):
+    """Get the all-time distinct visitor estimate for every object of a type."""
+    sketches = VisitorSketch.objects.filter(content_type=content_type, bucket=VisitorSketch.ALL_TIME)
+    return {
+        object_id: HyperLogLog.from_bytes(registers).count()
+        for object_id, registers in sketches.values_list('object_id', 'registers')
+    }
+
+
+def prune_day_sketches(before):
+    """Delete day sketches older than a date."""
+    deleted, _ = VisitorSketch.objects.exclude(bucket=VisitorSketch.ALL_TIME).filter(
+        bucket__lt=before.isoformat()
+    ).delete()
+    return deleted
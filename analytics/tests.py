@@ -1,3 +1,118 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import Max
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from brands.models import Brand, BrandStats
+
+from . import ingest
+from .models import Event, RollupState
+from .rollup import MISSING_EVENT_TIMEOUT, rollup_events
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.brand = Brand.objects.create(
+            title='Acme', slug='acme', description='x', full_description='x',
+            current_rank=1, brand_value='₦1T', growth_rate='+1%',
+        )
+
+    def view(self, **kwargs):
+        return Event.objects.create(
+            content_type='brand', object_id=self.brand.pk, event_type='view', **kwargs
+        )
+
+    def stats(self):
+        return BrandStats.objects.get(brand=self.brand)
+
+    def test_counts_each_event_once(self):
+        self.view()
+        self.view()
+        self.assertEqual(rollup_events(prune=False)['events'], 2)
+        self.assertEqual(rollup_events(prune=False)['events'], 0)
+        self.assertEqual(self.stats().total_views, 2)
+        self.assertEqual(self.stats().daily_views, 2)
+
+    def test_late_committed_event_is_counted(self):
+        first = self.view()
+        # first.pk + 1 belongs to an insert that has not committed yet
+        self.view(pk=first.pk + 2)
+        rollup_events(prune=False)
+        self.assertEqual(self.stats().total_views, 2)
+        self.assertEqual(RollupState.objects.get().missing_ranges[0][:2], [first.pk + 1, first.pk + 1])
+
+        self.view(pk=first.pk + 1)
+        self.assertEqual(rollup_events(prune=False)['events'], 1)
+        self.assertEqual(self.stats().total_views, 3)
+        self.assertEqual(RollupState.objects.get().missing_ranges, [])
+
+    def test_missing_ids_expire(self):
+        first = self.view()
+        self.view(pk=first.pk + 2)
+        rollup_events(prune=False)
+        rollup_events(prune=False, now=timezone.now() + MISSING_EVENT_TIMEOUT * 2)
+        self.assertEqual(RollupState.objects.get().missing_ranges, [])
+        self.assertEqual(RollupState.objects.get().last_event_id, Event.objects.aggregate(m=Max('pk'))['m'])
+
+    def test_windows_decay_for_objects_without_new_events(self):
+        self.view()
+        rollup_events(prune=False)
+        self.assertEqual(self.stats().daily_views, 1)
+        rollup_events(prune=False, now=timezone.now() + timedelta(days=2))
+        stats = self.stats()
+        self.assertEqual((stats.total_views, stats.daily_views, stats.weekly_views), (1, 0, 1))
+        rollup_events(prune=False, now=timezone.now() + timedelta(days=40))
+        stats = self.stats()
+        self.assertEqual((stats.total_views, stats.weekly_views, stats.monthly_views), (1, 0, 0))
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(ANALYTICS_SPOOL=Path(tmp.name) / 'events.sqlite3')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def spooled(self):
+        return ingest._connection().execute('SELECT COUNT(*) FROM spooled_events').fetchone()[0]
+
+    def test_events_are_spooled_without_touching_the_database(self):
+        occurred_at = timezone.now() - timedelta(minutes=5)
+        with self.assertNumQueries(0):
+            ingest.record_event('brand', 7, 'view', visitor_id='abc', occurred_at=occurred_at)
+            ingest.record_events([Event(content_type='blog', object_id=3, event_type='share')])
+        self.assertEqual(self.spooled(), 2)
+
+        self.assertEqual(ingest.drain_events(), 2)
+        self.assertEqual(self.spooled(), 0)
+        event = Event.objects.get(content_type='brand')
+        self.assertEqual((event.object_id, event.event_type, event.visitor_id), (7, 'view', 'abc'))
+        self.assertEqual(event.occurred_at, occurred_at)
+        self.assertEqual(ingest.drain_events(), 0)
+
+    def test_drain_in_batches(self):
+        ingest.record_events([Event(content_type='brand', object_id=i, event_type='view') for i in range(5)])
+        with mock.patch.object(ingest, 'DRAIN_BATCH_SIZE', 2):
+            self.assertEqual(ingest.drain_events(), 5)
+        self.assertEqual(Event.objects.count(), 5)
+
+    def test_events_drained_before_a_crash_are_not_drained_again(self):
+        ingest.record_event('brand', 1, 'view')
+        connection = ingest._connection()
+
+        def execute(sql, *args):
+            # The process dies before deleting the drained events from the spool
+            if not sql.startswith('DELETE'):
+                return connection.execute(sql, *args)
+
+        with mock.patch.object(ingest, '_connection', return_value=mock.Mock(execute=execute)):
+            ingest.drain_events()
+        self.assertEqual(self.spooled(), 1)
+        ingest.drain_events()
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertEqual(self.spooled(), 0)
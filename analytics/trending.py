@@ -0,0 +1,71 @@
+"""
+Time-decayed trending scores.
+
+Scores use forward decay: a view at time t adds weight exp(lambda * (t - EPOCH))
+instead of decaying every old view towards now. Relative order is the same as
+with classic exponential decay, but a score never has to be recomputed as
+time passes; new views are simply added to it. To stay within float range
+the stored trending_score is the natural log of the sum, combined with
+logaddexp.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+# content_type -> model label
+TRENDING_MODELS = {
+    'brand': 'brands.Brand',
+    'blog': 'blog.BlogPost',
+    'insight': 'insights.Insight',
+}
+
+
+def decay_rate():
+    """Get lambda, in 1/seconds, from TRENDING_HALF_LIFE_HOURS."""
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def log_weight(occurred_at, rate=None):
+    """Get the log of one view's forward-decayed weight."""
+    rate = decay_rate() if rate is None else rate
+    return rate * (occurred_at - EPOCH).total_seconds()
+
+
+def logaddexp(a, b):
+    """Compute log(exp(a) + exp(b)), treating None as log(0)."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def add_views(views):
+    """Fold (content_type, object_id, occurred_at) view rows into trending scores.
+
+    Reads and writes each affected model once with bulk_update.
+    """
+    rate = decay_rate()
+    scores = defaultdict(dict)
+    for content_type, object_id, occurred_at in views:
+        if content_type not in TRENDING_MODELS:
+            continue
+        current = scores[content_type].get(object_id)
+        scores[content_type][object_id] = logaddexp(current, log_weight(occurred_at, rate))
+    
+    updated = 0
+    for content_type, new_scores in scores.items():
+        model = apps.get_model(TRENDING_MODELS[content_type])
+        objects = list(model.objects.filter(pk__in=new_scores).only('pk', 'trending_score'))
+        for obj in objects:
+            obj.trending_score = logaddexp(obj.trending_score, new_scores[obj.pk])
+        model.objects.bulk_update(objects, ['trending_score'], batch_size=500)
+        updated += len(objects)
+    return updated
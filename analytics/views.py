@@ -1,3 +1,42 @@
-from django.shortcuts import render
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
-# Create your views here.
+from .ingest import record_events, visitor_fingerprint
+from .models import Event
+from .serializers import EventSerializer
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def ingest_events(request):
+    """Accept a batch of view/like/share events.
+
+    The body is either a list of events or {"events": [...]}, where each
+    event looks like {"type": "view", "target": "brand", "id": 12}.
+    """
+    payload = request.data
+    if isinstance(payload, dict):
+        payload = payload.get('events', [])
+    if not isinstance(payload, list) or not payload:
+        return Response({'error': 'Expected a non-empty list of events'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(payload) > settings.ANALYTICS_MAX_BATCH:
+        return Response(
+            {'error': f'At most {settings.ANALYTICS_MAX_BATCH} events per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    serializer = EventSerializer(data=payload, many=True)
+    serializer.is_valid(raise_exception=True)
+    fingerprint = visitor_fingerprint(request)
+    record_events([
+        Event(
+            content_type=event['target'], object_id=event['id'],
+            event_type=event['type'], visitor_id=event['visitor'] or fingerprint,
+        )
+        for event in serializer.validated_data
+    ])
+    return Response({'accepted': len(payload)}, status=status.HTTP_202_ACCEPTED)
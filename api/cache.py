@@ -0,0 +1,68 @@
+"""
+Response caching for the public read endpoints.
+
+Responses are keyed on the request path, its normalized query parameters and
+the version stamps of every kind of content the endpoint renders. Model
+signals (see api.signals) bump those stamps on write, so old entries are
+never scanned or deleted; they just age out of the cache.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from core.cache import get_versions
+
+
+def response_cache_key(request, namespaces):
+    """Build the cache key for a GET request."""
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+    )
+    versions = get_versions(*namespaces)
+    raw = repr((request.get_host(), request.path, params, namespaces, versions))
+    return 'response:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def cached_response(*namespaces):
+    """Cache successful GET responses of a view function or viewset action.
+
+    On a viewset, namespaces default to the view's ``cache_namespaces``.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            if request.method != 'GET':
+                return func(*args, **kwargs)
+
+            keys = namespaces or getattr(args[0], 'cache_namespaces', ())
+            key = response_cache_key(request, keys)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = func(*args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+class CachedResponseMixin:
+    """Cache list and retrieve responses of a read-only viewset."""
+    cache_namespaces = ()
+
+    @cached_response()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
@@ -0,0 +1,87 @@
+"""
+Filters for the public API.
+
+Brand financials are stored as display strings ("₦4.2T", "+12.5%"), so
+ordering and range filters on them go through the parsed numeric columns.
+"""
+import django_filters
+from django import forms
+from django.db.models import F
+from rest_framework import filters
+
+from brands.models import Brand
+from core.utils import parse_amount, parse_percent
+
+
+class AmountField(forms.CharField):
+    """Form field accepting amounts such as "1.5T", "₦800B" or "2500000"."""
+    parser = staticmethod(parse_amount)
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value in self.empty_values:
+            return None
+        number = self.parser(value)
+        if number is None:
+            raise forms.ValidationError(f'Enter a valid value, not "{value}".')
+        return number
+
+
+class PercentField(AmountField):
+    """Form field accepting percentages such as "+12.5%" or "-3"."""
+    parser = staticmethod(parse_percent)
+
+
+class AmountFilter(django_filters.Filter):
+    field_class = AmountField
+
+
+class PercentFilter(django_filters.Filter):
+    field_class = PercentField
+
+
+class BrandFilter(django_filters.FilterSet):
+    """Filters for BrandViewSet, including range filters on financials."""
+    brand_value__gte = AmountFilter(field_name='brand_value_amount', lookup_expr='gte')
+    brand_value__lte = AmountFilter(field_name='brand_value_amount', lookup_expr='lte')
+    market_cap__gte = AmountFilter(field_name='market_cap_amount', lookup_expr='gte')
+    market_cap__lte = AmountFilter(field_name='market_cap_amount', lookup_expr='lte')
+    revenue__gte = AmountFilter(field_name='revenue_amount', lookup_expr='gte')
+    revenue__lte = AmountFilter(field_name='revenue_amount', lookup_expr='lte')
+    growth_rate__gte = PercentFilter(field_name='growth_rate_percent', lookup_expr='gte')
+    growth_rate__lte = PercentFilter(field_name='growth_rate_percent', lookup_expr='lte')
+
+    class Meta:
+        model = Brand
+        fields = ['category', 'industry', 'is_featured', 'is_new_entry', 'year']
+
+
+class BrandOrderingFilter(filters.OrderingFilter):
+    """Ordering filter that sorts financial fields by their numeric value.
+
+    Brands without a value, including unranked brands, sort last.
+    """
+    numeric_fields = {
+        'current_rank': 'current_rank',
+        'brand_value': 'brand_value_amount',
+        'market_cap': 'market_cap_amount',
+        'revenue': 'revenue_amount',
+        'growth_rate': 'growth_rate_percent',
+    }
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [self.numeric_ordering(term) for term in ordering]
+
+    def numeric_ordering(self, term):
+        if not isinstance(term, str):
+            return term
+        descending = term.startswith('-')
+        field = self.numeric_fields.get(term.lstrip('-'))
+        if field is None:
+            return term
+        if descending:
+            return F(field).desc(nulls_last=True)
+        return F(field).asc(nulls_last=True)
@@ -1,8 +1,10 @@
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from brands.models import Brand, BrandMetric, BrandAchievement, BrandTimeline, BrandRanking
 from blog.models import BlogPost, BlogComment, BlogCategory
 from insights.models import Insight, InsightMetric, InsightKeyFinding
 from core.models import Category, Industry, Location
+from rankings.models import RankStability
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -54,6 +56,20 @@ class BrandRankingSerializer(serializers.ModelSerializer):
         fields = ['year', 'rank', 'brand_value', 'growth_rate', 'notes']
 
 
+class RankStabilitySerializer(serializers.ModelSerializer):
+    """Serializer for simulated rank stability."""
+    brand_slug = serializers.CharField(source='brand.slug', read_only=True)
+    brand_title = serializers.CharField(source='brand.title', read_only=True)
+    current_rank = serializers.IntegerField(source='brand.current_rank', read_only=True)
+    
+    class Meta:
+        model = RankStability
+        fields = [
+            'brand_slug', 'brand_title', 'current_rank', 'year', 'simulations',
+            'mean_rank', 'median_rank', 'rank_low', 'rank_high', 'prob_top_10', 'computed_at'
+        ]
+
+
 class BrandListSerializer(serializers.ModelSerializer):
     """Serializer for Brand list view (minimal data)."""
     category = CategorySerializer(read_only=True)
@@ -143,11 +159,26 @@ class BlogCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'color', 'icon', 'posts_count']
 
 
-class BlogPostListSerializer(serializers.ModelSerializer):
+class BlogImageMixin:
+    """Serialize featured_image_url with the image sequences loaded once per serializer.
+    
+    A list serializer reuses one child serializer for every row, so a page
+    of posts reads the sequences' version stamps once instead of per post.
+    """
+    
+    @cached_property
+    def image_sequences(self):
+        return BlogPost.get_image_sequences()
+    
+    def get_featured_image_url(self, obj):
+        return obj.get_featured_image_url(self.image_sequences)
+
+
+class BlogPostListSerializer(BlogImageMixin, serializers.ModelSerializer):
     """Serializer for BlogPost list view."""
     author = serializers.StringRelatedField()
     category = BlogCategorySerializer(read_only=True)
-    featured_image_url = serializers.ReadOnlyField()
+    featured_image_url = serializers.SerializerMethodField()
     comments_count = serializers.ReadOnlyField()
     
     class Meta:
@@ -160,11 +191,11 @@ class BlogPostListSerializer(serializers.ModelSerializer):
         ]
 
 
-class BlogPostDetailSerializer(serializers.ModelSerializer):
+class BlogPostDetailSerializer(BlogImageMixin, serializers.ModelSerializer):
     """Serializer for BlogPost detail view."""
     author = serializers.StringRelatedField()
     category = BlogCategorySerializer(read_only=True)
-    featured_image_url = serializers.ReadOnlyField()
+    featured_image_url = serializers.SerializerMethodField()
     comments_count = serializers.ReadOnlyField()
     tags = serializers.StringRelatedField(many=True)
     
@@ -241,6 +272,9 @@ class StatsSerializer(serializers.Serializer):
     total_insights = serializers.IntegerField()
     total_categories = serializers.IntegerField()
     combined_brand_value = serializers.CharField()
+    combined_brand_value_amount = serializers.DecimalField(max_digits=24, decimal_places=2)
     average_growth = serializers.CharField()
+    median_growth = serializers.CharField()
     top_performing_category = serializers.CharField()
+    top_category_by_value = serializers.CharField()
     latest_update = serializers.DateTimeField()
\ No newline at end of file
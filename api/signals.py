@@ -0,0 +1,74 @@
+"""
+Signal handlers that invalidate cached API responses.
+
+Each model maps to the version namespace of the endpoints that render it.
+Saves that only touch engagement counters are ignored so that view tracking
+does not flush the cache on every page view. Brands also bump a per-year
+namespace ("brands:2025") for caches that only depend on some years, for
+both the old and new year when a brand moves.
+"""
+from django.db.models.signals import post_save, post_delete
+
+from core.cache import bump_version_on_commit, year_namespace
+from core.models import Category, Industry, Location
+from brands.models import Brand, BrandMetric, BrandAchievement, BrandTimeline, BrandRanking
+from blog.models import BlogPost, BlogComment, BlogCategory
+from insights.models import Insight, InsightMetric, InsightKeyFinding
+from rankings.models import RankStability
+from rankings.simulation import STABILITY_NAMESPACE
+
+
+COUNTER_FIELDS = {'views_count', 'likes_count', 'shares_count', 'download_count'}
+
+CACHE_NAMESPACES = {
+    Brand: 'brands',
+    BrandMetric: 'brands',
+    BrandAchievement: 'brands',
+    BrandTimeline: 'brands',
+    BrandRanking: 'brands',
+    BlogPost: 'blog',
+    BlogComment: 'blog',
+    BlogCategory: 'blog',
+    Insight: 'insights',
+    InsightMetric: 'insights',
+    InsightKeyFinding: 'insights',
+    Category: 'taxonomy',
+    Industry: 'taxonomy',
+    Location: 'taxonomy',
+    RankStability: STABILITY_NAMESPACE,
+}
+
+# Models whose rows belong to one year, with their per-year namespace
+YEAR_NAMESPACES = {
+    Brand: 'brands',
+}
+
+
+def namespaces_for(sender, instance):
+    namespaces = [CACHE_NAMESPACES[sender]]
+    if sender in YEAR_NAMESPACES:
+        years = {instance.year}
+        # A row moved to another year also changes the year it was loaded from
+        previous = getattr(instance, '_loaded_year', None)
+        if previous is not None:
+            years.add(previous)
+        namespaces += [year_namespace(YEAR_NAMESPACES[sender], year) for year in years]
+    return namespaces
+
+
+def invalidate_on_save(sender, instance, update_fields=None, **kwargs):
+    """Bump the sender's cache namespace after a content change."""
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+    bump_version_on_commit(*namespaces_for(sender, instance))
+
+
+def invalidate_on_delete(sender, instance, **kwargs):
+    """Bump the sender's cache namespace after a delete."""
+    bump_version_on_commit(*namespaces_for(sender, instance))
+
+
+def connect_signals():
+    for model in CACHE_NAMESPACES:
+        post_save.connect(invalidate_on_save, sender=model, dispatch_uid=f'api_cache_save_{model.__name__}')
+        post_delete.connect(invalidate_on_delete, sender=model, dispatch_uid=f'api_cache_delete_{model.__name__}')
@@ -0,0 +1,70 @@
+"""
+Year-scoped site statistics.
+
+All brand aggregates come from one pass over the year's brand rows. The
+site_stats view caches its response under the content version stamps, so
+they are recomputed only after content changes.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from statistics import median
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from brands.models import Brand
+from blog.models import BlogPost
+from insights.models import Insight
+from core.models import Category
+from core.utils import format_amount, format_percent
+
+
+def compute_site_stats(year):
+    """Compute the statistics for one ranking year."""
+    rows = Brand.objects.filter(is_published=True, year=year).values_list(
+        'category__name', 'brand_value_amount', 'growth_rate_percent', 'updated_at'
+    )
+
+    total_brands = 0
+    combined_value = Decimal(0)
+    growth_rates = []
+    latest_brand_update = None
+    category_counts = defaultdict(int)
+    category_values = defaultdict(Decimal)
+    for category_name, value, growth, updated_at in rows:
+        total_brands += 1
+        if value is not None:
+            combined_value += value
+        if growth is not None:
+            growth_rates.append(growth)
+        if latest_brand_update is None or updated_at > latest_brand_update:
+            latest_brand_update = updated_at
+        if category_name:
+            category_counts[category_name] += 1
+            if value is not None:
+                category_values[category_name] += value
+
+    blog = BlogPost.objects.filter(status='published', is_published=True, year=year).aggregate(
+        total=Count('pk'), latest=Max('updated_at')
+    )
+    total_insights = Insight.objects.filter(is_published=True, year=year).count()
+    total_categories = Category.objects.filter(is_active=True).count()
+
+    average_growth = sum(growth_rates) / len(growth_rates) if growth_rates else None
+    median_growth = median(growth_rates) if growth_rates else None
+    updates = [update for update in (latest_brand_update, blog['latest']) if update is not None]
+
+    return {
+        'year': year,
+        'total_brands': total_brands,
+        'total_blog_posts': blog['total'],
+        'total_insights': total_insights,
+        'total_categories': total_categories,
+        'combined_brand_value': format_amount(combined_value) if total_brands else 'N/A',
+        'combined_brand_value_amount': combined_value,
+        'average_growth': format_percent(average_growth),
+        'median_growth': format_percent(median_growth),
+        'top_performing_category': max(category_counts, key=category_counts.get, default='N/A'),
+        'top_category_by_value': max(category_values, key=category_values.get, default='N/A'),
+        'latest_update': max(updates) if updates else timezone.now(),
+    }
@@ -1,3 +1,21 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django import forms
+from django.test import SimpleTestCase
+
+from .filters import AmountField, PercentField
+
+
+class AmountFieldTests(SimpleTestCase):
+    def test_parses_amounts(self):
+        self.assertEqual(AmountField(required=False).clean('1.5T'), Decimal('1500000000000.00'))
+        self.assertIsNone(AmountField(required=False).clean(''))
+
+    def test_rejects_invalid_and_out_of_range_values(self):
+        for field, value in [
+            (AmountField(), 'lots'),
+            (AmountField(), '9' * 30 + 'T'),
+            (PercentField(), '9' * 40),
+        ]:
+            with self.subTest(value=value), self.assertRaises(forms.ValidationError):
+                field.clean(value)
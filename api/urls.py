@@ -23,9 +23,14 @@ urlpatterns = [
 
     # Utility endpoints
     path('years/', views.available_years, name='available-years'),
+    path('years/<int:year>/stability/', views.rank_stability, name='rank-stability'),
+    path('years/<int:from_year>/diff/<int:to_year>/', views.year_diff, name='year-diff'),
     path('stats/', views.site_stats, name='site-stats'),
     path('search/', views.search, name='search'),
 
+    # Engagement events
+    path('analytics/', include('analytics.urls')),
+
     # Dashboard endpoints
     path('dashboard/', include('dashboard.urls')),
 ]
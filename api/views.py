@@ -4,23 +4,31 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
-from django.db.models import Q, Count, Avg, F
-from django.db import models
-from django.utils import timezone
-from datetime import timedelta
+from django.db.models import Q, F, OuterRef
+from django.shortcuts import get_object_or_404
+from collections import defaultdict
 
-from brands.models import Brand, BrandCategory
-from blog.models import BlogPost, BlogCategory
+from brands.models import Brand, BrandRanking
+from blog.models import BlogPost, BlogCategory, BlogComment
 from insights.models import Insight
+from analytics.ingest import record_event, visitor_fingerprint
+from core import counters
 from core.models import Category, Industry, Location
-from dashboard.models import YearlyRanking, SystemConfiguration
-
+from core.queries import count_by, subquery_count, top_n_per_group
+from dashboard.models import YearlyRanking
+from rankings.diff import get_year_diff
+from rankings.models import RankStability
+from rankings.simulation import STABILITY_NAMESPACE
+
+from .cache import cached_response, CachedResponseMixin
+from .filters import BrandFilter, BrandOrderingFilter
+from .stats import compute_site_stats
 from .serializers import (
     BrandListSerializer, BrandDetailSerializer,
     BlogPostListSerializer, BlogPostDetailSerializer, BlogCategorySerializer,
     InsightListSerializer, InsightDetailSerializer,
     CategorySerializer, IndustrySerializer, LocationSerializer,
-    StatsSerializer
+    StatsSerializer, RankStabilitySerializer
 )
 
 
@@ -31,7 +39,45 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class BrandViewSet(viewsets.ReadOnlyModelViewSet):
+class ViewCounterMixin:
+    """Buffer engagement counter increments for a viewset's objects."""
+    # Content type recorded on analytics view events
+    analytics_content_type = None
+
+    def increment_counter(self, field):
+        """Increment a counter and return its approximate live value."""
+        queryset = self.get_queryset().select_related(None).prefetch_related(None).only('pk', field)
+        instance = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[self.lookup_field]})
+        pending = counters.increment(instance, field)
+        if field == 'views_count' and self.analytics_content_type:
+            record_event(
+                self.analytics_content_type, instance.pk, 'view',
+                visitor_id=visitor_fingerprint(self.request)
+            )
+        return Response({field: getattr(instance, field) + pending})
+
+
+class TrendingMixin:
+    """Add a `trending` action ordered by the decayed view score."""
+    trending_limit = 10
+    max_trending_limit = 50
+
+    @action(detail=False, methods=['get'])
+    @cached_response()
+    def trending(self, request):
+        """Get the objects with the highest time-decayed view scores."""
+        try:
+            limit = min(int(request.query_params.get('limit', self.trending_limit)), self.max_trending_limit)
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        trending = self.filter_queryset(self.get_queryset()).filter(
+            trending_score__isnull=False
+        ).order_by('-trending_score')[:max(limit, 1)]
+        serializer = self.get_serializer(trending, many=True)
+        return Response(serializer.data)
+
+
+class BrandViewSet(ViewCounterMixin, TrendingMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Brand model."""
     queryset = Brand.objects.filter(is_published=True).select_related(
         'category', 'industry', 'headquarters'
@@ -39,12 +85,17 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         'metrics', 'achievements', 'timeline', 'rankings'
     )
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'industry', 'is_featured', 'is_new_entry', 'year']
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, BrandOrderingFilter]
+    filterset_class = BrandFilter
     search_fields = ['title', 'subtitle', 'description']
-    ordering_fields = ['current_rank', 'brand_value', 'growth_rate', 'brand_recognition', 'created_at']
+    ordering_fields = [
+        'current_rank', 'brand_value', 'market_cap', 'revenue', 'growth_rate',
+        'brand_recognition', 'created_at'
+    ]
     ordering = ['year', 'current_rank']
     lookup_field = 'slug'
+    cache_namespaces = ('brands', 'taxonomy', 'years')
+    analytics_content_type = 'brand'
 
     def get_queryset(self):
         """Filter by year - default to current active year."""
@@ -52,12 +103,8 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         year = self.request.query_params.get('year')
 
         if not year:
-            # Get current active year
-            try:
-                active_year = YearlyRanking.objects.get(is_active=True).year
-                year = active_year
-            except YearlyRanking.DoesNotExist:
-                year = 2025  # Default fallback
+            # Default to the current active year
+            year = YearlyRanking.get_active_year()
 
         return queryset.filter(year=year)
     
@@ -67,6 +114,7 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         return BrandListSerializer
     
     @action(detail=False, methods=['get'])
+    @cached_response()
     def top_10(self, request):
         """Get top 10 brands."""
         top_brands = self.get_queryset().filter(current_rank__lte=10)
@@ -74,6 +122,7 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response()
     def featured(self, request):
         """Get featured brands."""
         featured_brands = self.get_queryset().filter(is_featured=True)
@@ -81,6 +130,7 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response()
     def new_entries(self, request):
         """Get new entry brands."""
         new_brands = self.get_queryset().filter(is_new_entry=True)
@@ -88,16 +138,69 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response()
     def by_category(self, request):
         """Get brands grouped by category."""
         categories = Category.objects.all()
+        brands = top_n_per_group(self.get_queryset(), 'category', 5)  # Top 5 per category
+        grouped = defaultdict(list)
+        for brand in brands:
+            grouped[brand.category_id].append(brand)
         result = {}
         for category in categories:
-            brands = self.get_queryset().filter(category=category)[:5]  # Top 5 per category
-            result[category.slug] = BrandListSerializer(brands, many=True).data
+            result[category.slug] = self.get_serializer(grouped[category.id], many=True).data
         return Response(result)
     
     @action(detail=False, methods=['get'])
+    @cached_response()
+    def history(self, request):
+        """Get rank history for all brands as columnar arrays.
+        
+        rank[i][j], brand_value[i][j] and growth_rate[i][j] belong to
+        years[i] and brands[j]; null where the brand was not ranked.
+        Supports from_year, to_year and category (slug).
+        """
+        rankings = BrandRanking.objects.filter(brand__is_published=True)
+        try:
+            if request.query_params.get('from_year'):
+                rankings = rankings.filter(year__gte=int(request.query_params['from_year']))
+            if request.query_params.get('to_year'):
+                rankings = rankings.filter(year__lte=int(request.query_params['to_year']))
+        except ValueError:
+            return Response({'error': 'Invalid year'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('category'):
+            rankings = rankings.filter(brand__category__slug=request.query_params['category'])
+        
+        rows = rankings.order_by('year', 'rank').values_list(
+            'year', 'brand__slug', 'brand__title', 'rank', 'brand_value_amount', 'growth_rate_percent'
+        )
+        years, brands, titles, cells = [], {}, {}, {}
+        for year, slug, title, rank, value, growth in rows:
+            if not years or years[-1] != year:
+                years.append(year)
+            brands.setdefault(slug, len(brands))
+            titles[slug] = title
+            cells[(year, slug)] = (rank, value, growth)
+        
+        def number(value):
+            return None if value is None else float(value)
+        
+        def column(index, convert):
+            return [
+                [convert(cells[(year, slug)][index]) if (year, slug) in cells else None for slug in brands]
+                for year in years
+            ]
+        
+        return Response({
+            'years': years,
+            'brands': [{'slug': slug, 'title': titles[slug]} for slug in brands],
+            'rank': column(0, int),
+            'brand_value': column(1, number),
+            'growth_rate': column(2, number),
+        })
+    
+    @action(detail=False, methods=['get'])
+    @cached_response()
     def most_popular(self, request):
         """Get most popular brands based on views and customer rating."""
         try:
@@ -115,19 +218,20 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
-    def increment_views(self, request, pk=None):
+    def increment_views(self, request, slug=None):
         """Increment brand views count."""
-        brand = self.get_object()
-        brand.views_count += 1
-        brand.save(update_fields=['views_count'])
-        return Response({'views_count': brand.views_count})
+        return self.increment_counter('views_count')
 
 
-class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
+class BlogPostViewSet(ViewCounterMixin, TrendingMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for BlogPost model."""
     queryset = BlogPost.objects.filter(
         status='published', is_published=True
-    ).select_related('author', 'category').prefetch_related('tags')
+    ).select_related('author', 'category').prefetch_related('tags').annotate(
+        approved_comments_count=subquery_count(
+            BlogComment.objects.filter(post=OuterRef('pk'), is_approved=True)
+        )
+    )
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'author', 'is_featured']
@@ -135,6 +239,8 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['published_at', 'views_count', 'likes_count', 'created_at']
     ordering = ['-published_at']
     lookup_field = 'slug'
+    cache_namespaces = ('blog', 'taxonomy')
+    analytics_content_type = 'blog'
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -142,6 +248,7 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
         return BlogPostListSerializer
     
     @action(detail=False, methods=['get'])
+    @cached_response()
     def featured(self, request):
         """Get featured blog posts."""
         featured_posts = self.get_queryset().filter(is_featured=True)[:5]
@@ -149,6 +256,7 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cached_response()
     def recent(self, request):
         """Get recent blog posts."""
         recent_posts = self.get_queryset()[:8]
@@ -156,15 +264,12 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
-    def increment_views(self, request, pk=None):
+    def increment_views(self, request, slug=None):
         """Increment blog post views count."""
-        post = self.get_object()
-        post.views_count += 1
-        post.save(update_fields=['views_count'])
-        return Response({'views_count': post.views_count})
+        return self.increment_counter('views_count')
 
 
-class InsightViewSet(viewsets.ReadOnlyModelViewSet):
+class InsightViewSet(ViewCounterMixin, TrendingMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Insight model."""
     queryset = Insight.objects.filter(is_published=True).select_related(
         'author', 'category'
@@ -176,6 +281,8 @@ class InsightViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['published_at', 'views_count', 'download_count', 'created_at']
     ordering = ['-published_at']
     lookup_field = 'slug'
+    cache_namespaces = ('insights', 'taxonomy')
+    analytics_content_type = 'insight'
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -183,6 +290,7 @@ class InsightViewSet(viewsets.ReadOnlyModelViewSet):
         return InsightListSerializer
     
     @action(detail=False, methods=['get'])
+    @cached_response()
     def featured(self, request):
         """Get featured insights."""
         featured_insights = self.get_queryset().filter(is_featured=True)[:6]
@@ -193,46 +301,39 @@ class InsightViewSet(viewsets.ReadOnlyModelViewSet):
 
 
     @action(detail=False, methods=['get'])
+    @cached_response()
     def by_type(self, request):
         """Get insights grouped by type."""
         insight_types = dict(Insight.INSIGHT_TYPES)
+        insights = top_n_per_group(self.get_queryset(), 'insight_type', 3)
+        grouped = defaultdict(list)
+        for insight in insights:
+            grouped[insight.insight_type].append(insight)
         result = {}
         for type_key, type_name in insight_types.items():
-            insights = self.get_queryset().filter(insight_type=type_key)[:3]
             result[type_key] = {
                 'name': type_name,
-                'insights': InsightListSerializer(insights, many=True).data
+                'insights': self.get_serializer(grouped[type_key], many=True).data
             }
         return Response(result)
     
     @action(detail=True, methods=['post'])
-    def increment_views(self, request, slug=None, pk=None):
+    def increment_views(self, request, slug=None):
         """Increment insight views count."""
-        try:
-            insight = self.get_object()
-            insight.views_count += 1
-            insight.save(update_fields=['views_count'])
-            return Response({'views_count': insight.views_count})
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to increment views: {str(e)}'}, 
-                status=400
-            )
+        return self.increment_counter('views_count')
     
     @action(detail=True, methods=['post'])
-    def increment_downloads(self, request, pk=None):
+    def increment_downloads(self, request, slug=None):
         """Increment insight downloads count."""
-        insight = self.get_object()
-        insight.download_count += 1
-        insight.save(update_fields=['download_count'])
-        return Response({'download_count': insight.download_count})
+        return self.increment_counter('download_count')
 
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(CachedResponseMixin, generics.ListAPIView):
     """List view for categories."""
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     pagination_class = None
+    cache_namespaces = ('taxonomy',)
 
 
 class IndustryListView(generics.ListAPIView):
@@ -251,7 +352,11 @@ class LocationListView(generics.ListAPIView):
 
 class BlogCategoryListView(generics.ListAPIView):
     """List view for blog categories."""
-    queryset = BlogCategory.objects.filter(is_active=True)
+    queryset = BlogCategory.objects.filter(is_active=True).annotate(
+        published_posts_count=subquery_count(
+            BlogPost.objects.filter(category__slug=OuterRef('slug'), status='published', is_published=True)
+        )
+    )
     serializer_class = BlogCategorySerializer
     pagination_class = None
 
@@ -264,75 +369,61 @@ class FeaturesListView(generics.ListAPIView):
 
 
 @api_view(['GET'])
+@cached_response('years', 'brands', 'blog', 'insights')
 def available_years(request):
     """Get all available years with their status."""
-    years = YearlyRanking.objects.all().values(
+    years = list(YearlyRanking.objects.all().values(
         'year', 'title', 'is_active', 'is_published', 'is_complete',
         'total_brands', 'publication_date'
-    )
+    ))
 
-    # Add counts for each year
+    # Add counts for each year, one grouped query per content type
+    brand_counts = count_by(Brand.objects.filter(is_published=True), 'year')
+    blog_post_counts = count_by(BlogPost.objects.filter(is_published=True), 'year')
+    insight_counts = count_by(Insight.objects.filter(is_published=True), 'year')
     for year_data in years:
         year = year_data['year']
-        year_data['brands_count'] = Brand.objects.filter(year=year, is_published=True).count()
-        year_data['blog_posts_count'] = BlogPost.objects.filter(year=year, is_published=True).count()
-        year_data['insights_count'] = Insight.objects.filter(year=year, is_published=True).count()
+        year_data['brands_count'] = brand_counts.get(year, 0)
+        year_data['blog_posts_count'] = blog_post_counts.get(year, 0)
+        year_data['insights_count'] = insight_counts.get(year, 0)
 
     return Response({
-        'years': list(years),
-        'current_year': YearlyRanking.objects.filter(is_active=True).first().year if YearlyRanking.objects.filter(is_active=True).exists() else 2025
+        'years': years,
+        'current_year': YearlyRanking.get_active_year()
     })
 
 
 @api_view(['GET'])
+def year_diff(request, from_year, to_year):
+    """Get what changed in the ranking between two years."""
+    if from_year == to_year:
+        return Response({'error': 'Choose two different years'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(get_year_diff(from_year, to_year))
+
+
+@api_view(['GET'])
+@cached_response(STABILITY_NAMESPACE, 'brands')
+def rank_stability(request, year):
+    """Get the simulated rank intervals of a year's brands."""
+    rows = RankStability.objects.filter(year=year).select_related('brand').order_by(
+        F('brand__current_rank').asc(nulls_last=True)
+    )
+    serializer = RankStabilitySerializer(rows, many=True)
+    return Response({'year': year, 'results': serializer.data})
+
+
+@api_view(['GET'])
+@cached_response('years', 'brands', 'blog', 'insights', 'taxonomy')
 def site_stats(request):
     """Get site statistics."""
     # Get year parameter
-    year = request.GET.get('year')
-    if not year:
-        try:
-            year = YearlyRanking.objects.get(is_active=True).year
-        except YearlyRanking.DoesNotExist:
-            year = 2025
-
-    # Calculate stats for specific year
-    total_brands = Brand.objects.filter(is_published=True, year=year).count()
-    total_blog_posts = BlogPost.objects.filter(status='published', is_published=True, year=year).count()
-    total_insights = Insight.objects.filter(is_published=True, year=year).count()
-    total_categories = Category.objects.filter(is_active=True).count()
-    
-    # Calculate combined brand value (simplified)
-    combined_value = "₦25.8T"  # This would be calculated from actual brand values
-    
-    # Calculate average growth
-    avg_growth = "+12.3%"  # This would be calculated from actual growth rates
-    
-    # Get top performing category
-    top_category = Category.objects.annotate(
-        brand_count=Count('brand')
-    ).order_by('-brand_count').first()
-    
-    # Get latest update
-    latest_brand_update = Brand.objects.filter(is_published=True).order_by('-updated_at').first()
-    latest_blog_update = BlogPost.objects.filter(status='published').order_by('-updated_at').first()
-    
-    latest_update = max(
-        latest_brand_update.updated_at if latest_brand_update else timezone.now(),
-        latest_blog_update.updated_at if latest_blog_update else timezone.now()
-    )
-    
-    stats_data = {
-        'total_brands': total_brands,
-        'total_blog_posts': total_blog_posts,
-        'total_insights': total_insights,
-        'total_categories': total_categories,
-        'combined_brand_value': combined_value,
-        'average_growth': avg_growth,
-        'top_performing_category': top_category.name if top_category else 'N/A',
-        'latest_update': latest_update,
-    }
-    
-    serializer = StatsSerializer(stats_data)
+    year = request.GET.get('year') or YearlyRanking.get_active_year()
+    try:
+        year = int(year)
+    except ValueError:
+        return Response({'error': 'year must be a valid year'}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = StatsSerializer(compute_site_stats(year))
     return Response(serializer.data)
 
 
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_blogpost_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='trending_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Log of time-decayed views, maintained by analytics.trending', null=True),
+        ),
+    ]
@@ -7,6 +7,7 @@ from core.models import (
     TimeStampedModel, SEOModel, PublishableModel, 
     ViewTrackingModel, Category
 )
+from core.cache import versioned_local
 
 
 class BlogPost(TimeStampedModel, SEOModel, PublishableModel, ViewTrackingModel):
@@ -62,44 +63,56 @@ class BlogPost(TimeStampedModel, SEOModel, PublishableModel, ViewTrackingModel):
     @property
     def featured_image_url(self):
         """Get featured image URL with fallback."""
+        return self.get_featured_image_url(BlogPost.get_image_sequences())
+    
+    def get_featured_image_url(self, image_sequences):
+        """Get the featured image URL using already loaded image sequences."""
         if self.featured_image:
             return self.featured_image.url
         
-        # Use different image paths based on category
+        # Events and Activities use sequential numbering starting from 1
         if self.category and self.category.name == 'Events':
-            # For events, use sequential numbering starting from 1
-            event_posts = BlogPost.objects.filter(
-                category__name='Events', 
-                is_featured=True, 
-                is_published=True
-            ).order_by('id')
-            try:
-                event_index = list(event_posts.values_list('id', flat=True)).index(self.id) + 1
-                return f'/events/event-{event_index}.png'
-            except (ValueError, IndexError):
-                return f'/events/event-1.png'
+            event_index = image_sequences['Events'].get(self.id, 1)
+            return f'/events/event-{event_index}.png'
         
         elif self.category and self.category.name == 'Activities':
-            # For activities, use sequential numbering starting from 1
-            activity_posts = BlogPost.objects.filter(
-                category__name='Activities', 
-                is_published=True
-            ).order_by('id')
-            try:
-                activity_index = list(activity_posts.values_list('id', flat=True)).index(self.id) + 1
-                return f'/activities/activity-{activity_index}.png'
-            except (ValueError, IndexError):
-                return f'/activities/activity-1.png'
+            activity_index = image_sequences['Activities'].get(self.id, 1)
+            return f'/activities/activity-{activity_index}.png'
         
         # Default fallback for other blog posts
         return f'/blog/blog-{self.id}.png'
     
+    @classmethod
+    def get_image_sequences(cls):
+        """Map post ids to their 1-based image number, per category (Events, Activities).
+
+        Reused until a blog post or category changes.
+        """
+        return _image_sequences()
+    
     @property
     def comments_count(self):
         """Get total comments count."""
+        if hasattr(self, 'approved_comments_count'):
+            return self.approved_comments_count
         return self.comments.filter(is_approved=True).count()
 
 
+
+def _load_image_sequences():
+    sequences = {}
+    for category_name in ('Events', 'Activities'):
+        posts = BlogPost.objects.filter(category__name=category_name, is_published=True)
+        if category_name == 'Events':
+            posts = posts.filter(is_featured=True)
+        post_ids = posts.order_by('id').values_list('id', flat=True)
+        sequences[category_name] = {post_id: index for index, post_id in enumerate(post_ids, start=1)}
+    return sequences
+
+
+_image_sequences = versioned_local(('blog', 'taxonomy'), _load_image_sequences)
+
+
 class BlogComment(TimeStampedModel):
     """Blog comment model."""
     post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='comments')
@@ -154,7 +167,10 @@ class BlogCategory(TimeStampedModel):
     @property
     def posts_count(self):
         """Get count of published posts in this category."""
-        return BlogPost.objects.filter(category=self, status='published', is_published=True).count()
+        if hasattr(self, 'published_posts_count'):
+            return self.published_posts_count
+        # Posts are filed under core categories, matched to blog categories by slug
+        return BlogPost.objects.filter(category__slug=self.slug, status='published', is_published=True).count()
 
 
 class BlogTag(TimeStampedModel):
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from brands.models import Brand, BrandRanking, update_numeric_fields
+from core.cache import bump_version_on_commit, year_namespace
+
+
+class Command(BaseCommand):
+    help = 'Fill the numeric brand value, market cap, revenue and growth columns from their display strings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in (Brand, BrandRanking):
+            fields = [target for target, parser in model.NUMERIC_FIELDS.values()]
+            batch = []
+            updated = unparsed = 0
+            for instance in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+                update_numeric_fields(instance)
+                for source, (target, parser) in model.NUMERIC_FIELDS.items():
+                    if getattr(instance, source) and getattr(instance, target) is None:
+                        unparsed += 1
+                        self.stderr.write(f'{model.__name__} {instance.pk}: could not parse {source}={getattr(instance, source)!r}')
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    model.objects.bulk_update(batch, fields)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, fields)
+                updated += len(batch)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model.__name__}: updated {updated} rows ({unparsed} values could not be parsed)'
+            ))
+        years = Brand.objects.values_list('year', flat=True).distinct()
+        bump_version_on_commit('brands', *(year_namespace('brands', year) for year in years))
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brands', '0002_alter_brand_options_brand_year_alter_brand_slug_and_more'),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brand',
+            name='brand_value_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Brand value in naira', max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='growth_rate_percent',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Growth rate in percent', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='market_cap_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Market capitalization in naira', max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='revenue_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Annual revenue in naira', max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='brandranking',
+            name='brand_value_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Brand value in naira', max_digits=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='brandranking',
+            name='growth_rate_percent',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Growth rate in percent', max_digits=8, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='brand',
+            index=models.Index(fields=['year', 'brand_value_amount'], name='brands_bran_year_1b9d55_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='brand',
+            index=models.Index(fields=['year', 'growth_rate_percent'], name='brands_bran_year_27bb7d_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:11
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brands', '0004_trending_score'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='brand',
+            options={'ordering': ['year', models.OrderBy(models.F('current_rank'), nulls_last=True)]},
+        ),
+        migrations.AlterField(
+            model_name='brand',
+            name='current_rank',
+            field=models.PositiveIntegerField(blank=True, help_text='Current ranking position (1-50); empty for a published brand outside the ranking', null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(50)]),
+        ),
+    ]
@@ -5,6 +5,24 @@ from core.models import (
     TimeStampedModel, SEOModel, PublishableModel, 
     SocialMediaModel, ViewTrackingModel, Category, Industry, Location
 )
+from core.utils import parse_amount, parse_percent
+
+
+def update_numeric_fields(instance, update_fields=None):
+    """Refresh an instance's numeric shadow columns from its display strings.
+
+    Returns update_fields extended with the shadow columns whose source
+    field is being saved.
+    """
+    for source, (target, parser) in instance.NUMERIC_FIELDS.items():
+        setattr(instance, target, parser(getattr(instance, source)))
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    for source, (target, parser) in instance.NUMERIC_FIELDS.items():
+        if source in update_fields:
+            update_fields.add(target)
+    return update_fields
 
 
 class Brand(TimeStampedModel, SEOModel, PublishableModel, SocialMediaModel, ViewTrackingModel):
@@ -27,8 +45,9 @@ class Brand(TimeStampedModel, SEOModel, PublishableModel, SocialMediaModel, View
     
     # Ranking Information
     current_rank = models.PositiveIntegerField(
+        null=True, blank=True,
         validators=[MinValueValidator(1), MaxValueValidator(50)],
-        help_text="Current ranking position (1-50)"
+        help_text="Current ranking position (1-50); empty for a published brand outside the ranking"
     )
     previous_rank = models.PositiveIntegerField(
         null=True, blank=True,
@@ -42,6 +61,24 @@ class Brand(TimeStampedModel, SEOModel, PublishableModel, SocialMediaModel, View
     revenue = models.CharField(max_length=20, blank=True, help_text="Annual revenue")
     growth_rate = models.CharField(max_length=10, help_text="Growth rate (e.g., +12.5%)")
     
+    # Numeric values parsed from the financial data on save, for sorting and aggregates
+    brand_value_amount = models.DecimalField(
+        max_digits=20, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Brand value in naira"
+    )
+    market_cap_amount = models.DecimalField(
+        max_digits=20, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Market capitalization in naira"
+    )
+    revenue_amount = models.DecimalField(
+        max_digits=20, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Annual revenue in naira"
+    )
+    growth_rate_percent = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Growth rate in percent"
+    )
+    
     # Company Details
     founded_year = models.CharField(max_length=4, blank=True, help_text="Year founded")
     ceo = models.CharField(max_length=200, blank=True, help_text="CEO name")
@@ -75,24 +112,44 @@ class Brand(TimeStampedModel, SEOModel, PublishableModel, SocialMediaModel, View
     
     class Meta:
         unique_together = [['slug', 'year']]
-        ordering = ['year', 'current_rank']
+        ordering = ['year', models.F('current_rank').asc(nulls_last=True)]
         indexes = [
             models.Index(fields=['year', 'current_rank']),
             models.Index(fields=['year', 'slug']),
+            models.Index(fields=['year', 'brand_value_amount']),
+            models.Index(fields=['year', 'growth_rate_percent']),
         ]
 
+    NUMERIC_FIELDS = {
+        'brand_value': ('brand_value_amount', parse_amount),
+        'market_cap': ('market_cap_amount', parse_amount),
+        'revenue': ('revenue_amount', parse_amount),
+        'growth_rate': ('growth_rate_percent', parse_percent),
+    }
+
     def __str__(self):
+        if self.current_rank is None:
+            return f"Unranked - {self.title}"
         return f"#{self.current_rank} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored year, so moving a brand invalidates the year it left
+        instance._loaded_year = instance.__dict__.get('year')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        kwargs['update_fields'] = update_numeric_fields(self, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
+        self._loaded_year = self.year
     
     @property
     def rank_change(self):
         """Calculate rank change from previous year."""
-        if self.previous_rank:
+        if self.previous_rank and self.current_rank:
             return self.previous_rank - self.current_rank
         return 0
     
@@ -187,12 +244,56 @@ class BrandRanking(TimeStampedModel):
     growth_rate = models.CharField(max_length=10, blank=True, help_text="Growth rate")
     notes = models.TextField(blank=True, help_text="Additional notes")
     
+    # Numeric values parsed on save
+    brand_value_amount = models.DecimalField(
+        max_digits=20, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Brand value in naira"
+    )
+    growth_rate_percent = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Growth rate in percent"
+    )
+    
     class Meta:
         ordering = ['-year', 'rank']
         unique_together = ['brand', 'year']
     
+    NUMERIC_FIELDS = {
+        'brand_value': ('brand_value_amount', parse_amount),
+        'growth_rate': ('growth_rate_percent', parse_percent),
+    }
+    
     def __str__(self):
         return f"{self.brand.title} - {self.year}: #{self.rank}"
+    
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = update_numeric_fields(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def snapshot(cls, brands, year, batch_size=500):
+        """Record each ranked brand's current rank and financials for a year.
+        
+        Existing rows for the same brand and year are overwritten; unranked
+        brands are skipped.
+        """
+        snapshots = []
+        for brand in brands:
+            if brand.current_rank is None:
+                continue
+            snapshot = cls(
+                brand=brand, year=year, rank=brand.current_rank,
+                brand_value=brand.brand_value, growth_rate=brand.growth_rate,
+            )
+            update_numeric_fields(snapshot)
+            snapshots.append(snapshot)
+        cls.objects.bulk_create(
+            snapshots, batch_size=batch_size, update_conflicts=True, unique_fields=['brand', 'year'],
+            update_fields=[
+                'rank', 'brand_value', 'growth_rate', 'brand_value_amount', 'growth_rate_percent', 'updated_at',
+            ],
+        )
+        return len(snapshots)
 
 
 class BrandCategory(TimeStampedModel):
@@ -0,0 +1,119 @@
+"""
+Shared cache helpers.
+
+Cached data is never deleted explicitly. Instead every kind of content has a
+version stamp in the shared cache; writers bump the stamp and readers include
+it in their cache keys, so stale entries simply stop being looked up.
+Small, hot values can also be kept in process memory with versioned_local,
+which rebuilds them once the stamps they were built under change.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY_PREFIX = 'version'
+
+
+def _version_key(namespace):
+    return f'{VERSION_KEY_PREFIX}:{namespace}'
+
+
+def _new_stamp():
+    # Seed with a clock value rather than 1 so that a cleared cache never
+    # hands out a stamp an in-process cache has already seen.
+    return time.time_ns()
+
+
+def year_namespace(namespace, year):
+    """Get the namespace for one year's slice of a kind of content, e.g. "brands:2025"."""
+    return f'{namespace}:{year}'
+
+
+def get_version(namespace):
+    """Get the current version stamp for a namespace."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_stamp(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*namespaces):
+    """Get the version stamps for several namespaces in one cache round trip."""
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, namespace in keys.items():
+        if key in found:
+            versions[namespace] = found[key]
+        else:
+            versions[namespace] = get_version(namespace)
+    return tuple(versions[namespace] for namespace in namespaces)
+
+
+def version_tag(*namespaces):
+    """Get a cache-key-safe tag combining the stamps of several namespaces."""
+    return '.'.join(str(version) for version in get_versions(*namespaces))
+
+
+def bump_version(namespace):
+    """Invalidate everything cached under a namespace."""
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _new_stamp()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_version_on_commit(*namespaces):
+    """Bump version stamps once the current transaction commits.
+
+    Bumping before commit would let a concurrent reader cache the old rows
+    under the new stamp.
+    """
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+    transaction.on_commit(bump)
+
+
+class VersionedLocal:
+    """Process-local cache of loader results, emptied when a namespace's stamp changes.
+
+    Results are keyed by the loader arguments; once maxsize are held the
+    cache starts over.
+    """
+
+    def __init__(self, namespaces, loader, maxsize=32):
+        self.namespaces = (namespaces,) if isinstance(namespaces, str) else tuple(namespaces)
+        self.loader = loader
+        self.maxsize = maxsize
+        self._version = None
+        self._values = {}
+
+    def __call__(self, *args):
+        version = get_versions(*self.namespaces)
+        values = self._values
+        if version != self._version:
+            values = {}
+            self._values, self._version = values, version
+        if args in values:
+            return values[args]
+        value = self.loader(*args)
+        if len(values) >= self.maxsize:
+            values.clear()
+        values[args] = value
+        return value
+
+    def clear(self):
+        self._values, self._version = {}, None
+
+
+def versioned_local(namespaces, loader, maxsize=32):
+    """Cache loader(*args) in process memory until a namespace's version stamp changes."""
+    return VersionedLocal(namespaces, loader, maxsize)
@@ -0,0 +1,222 @@
+"""
+Cache backend shared by every worker process on one host.
+
+Entries live in a SQLite database in WAL mode, so gunicorn workers see the
+same data and counters, ``clear()`` affects all of them, and nothing is lost
+when a worker restarts. Integers are stored natively so ``incr`` is a single
+atomic UPDATE; everything else is pickled. Expired entries are dropped
+lazily and the least recently used ones are culled once MAX_ENTRIES is
+exceeded.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+
+class SQLiteCache(BaseCache):
+    """Django cache backend storing entries in a local SQLite file."""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    # Reads only refresh an entry's LRU timestamp when it is older than this,
+    # which keeps hot reads from turning into writes.
+    touch_interval = 1.0
+
+    # Check the entry count once every this many writes per process.
+    cull_check_interval = 64
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        options = params.get('OPTIONS', {})
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5.0)
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        """Get this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value, expires, accessed FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            conn.execute('DELETE FROM cache_entries WHERE key = ? AND expires <= ?', (key, now))
+            return default
+        if accessed < now - self.touch_interval:
+            conn.execute('UPDATE cache_entries SET accessed = ? WHERE key = ?', (now, key))
+        return self._decode(value)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        now = time.time()
+        conn = self._connection()
+        placeholders = ', '.join('?' * len(key_map))
+        rows = conn.execute(
+            f'SELECT key, value, accessed FROM cache_entries WHERE key IN ({placeholders}) '
+            'AND (expires IS NULL OR expires > ?)',
+            [*key_map, now],
+        ).fetchall()
+        stale = [key for key, value, accessed in rows if accessed < now - self.touch_interval]
+        if stale:
+            conn.execute(
+                f"UPDATE cache_entries SET accessed = ? WHERE key IN ({', '.join('?' * len(stale))})",
+                [now, *stale],
+            )
+        return {key_map[key]: self._decode(value) for key, value, accessed in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+            (key, self._encode(value), self._expires(timeout), time.time()),
+        )
+        self._after_write()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = [
+            (self.make_and_validate_key(key, version=version), self._encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                rows,
+            )
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        self._after_write()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache_entries WHERE key = ? AND expires <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache_entries (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, self._encode(value), self._expires(timeout), now),
+            )
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        self._after_write()
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                "UPDATE cache_entries SET value = value + ? WHERE key = ? "
+                "AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?)",
+                (delta, key, time.time()),
+            )
+            row = None
+            if cursor.rowcount == 1:
+                row = conn.execute('SELECT value FROM cache_entries WHERE key = ?', (key,)).fetchone()
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        if row is None:
+            raise ValueError("Key '%s' not found" % key)
+        return row[0]
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [(self.make_and_validate_key(key, version=version),) for key in keys]
+        self._connection().executemany('DELETE FROM cache_entries WHERE key = ?', keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % self.cull_check_interval == 0:
+            self._cull()
+
+    def _cull(self):
+        """Drop expired entries, then the least recently used beyond MAX_ENTRIES."""
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        excess = count - self._max_entries
+        if self._cull_frequency:
+            excess += self._max_entries // self._cull_frequency
+        conn.execute(
+            'DELETE FROM cache_entries WHERE key IN ('
+            'SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)',
+            (excess,),
+        )
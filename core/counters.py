@@ -0,0 +1,192 @@
+"""
+Write-behind engagement counters.
+
+Increments are summed in a separate SQLite counter database
+(COUNTER_DATABASE) with a single atomic upsert, so page views never write
+to the main database or contend for a hot brand or post row. Every
+COUNTER_FLUSH_INTERVAL seconds one process folds the pending amounts into
+the counted rows as batched ``F()`` updates, in a background thread so no
+request waits for it; the ``run_jobs`` worker and the ``flush_counters``
+command flush too.
+
+A flush first moves a batch of amounts to a ``flushing`` column under a
+token, then applies them in a main database transaction that records the
+token in CounterFlush, then clears the batch. A flush that dies part way is
+finished by the next one, and the recorded token keeps a batch from being
+applied twice.
+"""
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CounterFlush
+from .sqlite import connect, write_transaction
+
+
+# Every counter that may be buffered, as (model label, field)
+TRACKED_COUNTERS = [
+    ('brands.Brand', 'views_count'),
+    ('blog.BlogPost', 'views_count'),
+    ('insights.Insight', 'views_count'),
+    ('insights.Insight', 'download_count'),
+]
+
+# Counters applied per flush transaction
+FLUSH_BATCH_SIZE = 5000
+
+# How long applied flush tokens are kept in CounterFlush
+FLUSH_RECORD_RETENTION = timedelta(days=1)
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS pending_counters ('
+    'model TEXT NOT NULL, object_id INTEGER NOT NULL, field TEXT NOT NULL, '
+    'amount INTEGER NOT NULL DEFAULT 0, flushing INTEGER NOT NULL DEFAULT 0, '
+    'PRIMARY KEY (model, object_id, field))',
+    'CREATE TABLE IF NOT EXISTS counter_state (key TEXT PRIMARY KEY, value)',
+]
+
+_last_check = [time.monotonic()]
+
+
+def _connection():
+    return connect(settings.COUNTER_DATABASE, SCHEMA)
+
+
+def _get_state(conn, key):
+    row = conn.execute('SELECT value FROM counter_state WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_state(conn, key, value):
+    conn.execute('INSERT OR REPLACE INTO counter_state (key, value) VALUES (?, ?)', (key, value))
+
+
+def increment(instance, field, amount=1):
+    """Buffer an increment and return the total not yet written to the counter."""
+    row = _connection().execute(
+        'INSERT INTO pending_counters (model, object_id, field, amount) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT (model, object_id, field) DO UPDATE SET amount = amount + excluded.amount '
+        'RETURNING amount + flushing',
+        (instance._meta.label, instance.pk, field, amount),
+    ).fetchone()
+    maybe_flush()
+    return row[0]
+
+
+def pending_count(instance, field):
+    """Get the buffered increments for one counter."""
+    row = _connection().execute(
+        'SELECT amount + flushing FROM pending_counters WHERE model = ? AND object_id = ? AND field = ?',
+        (instance._meta.label, instance.pk, field),
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def live_count(instance, field):
+    """Get a counter's stored value plus its buffered increments."""
+    return getattr(instance, field) + pending_count(instance, field)
+
+
+def maybe_flush():
+    """Start a background flush if no process has flushed for COUNTER_FLUSH_INTERVAL.
+
+    Each process looks at most once per interval, and claiming the flush is
+    a compare-and-set on the shared timestamp, so one process wins.
+    """
+    interval = settings.COUNTER_FLUSH_INTERVAL
+    if time.monotonic() - _last_check[0] < interval:
+        return
+    _last_check[0] = time.monotonic()
+    conn = _connection()
+    now = time.time()
+    last_flush = _get_state(conn, 'last_flush')
+    if last_flush is None:
+        conn.execute("INSERT OR IGNORE INTO counter_state (key, value) VALUES ('last_flush', ?)", (now,))
+        return
+    if now - last_flush < interval:
+        return
+    claimed = conn.execute(
+        "UPDATE counter_state SET value = ? WHERE key = 'last_flush' AND value = ?", (now, last_flush)
+    ).rowcount
+    if claimed:
+        threading.Thread(target=_background_flush, name='counter-flush', daemon=True).start()
+
+
+def _background_flush():
+    try:
+        flush()
+    except Exception:
+        # Whatever was claimed stays in the counter database for the next flush
+        pass
+    finally:
+        connections.close_all()
+
+
+def _claim_batch(conn):
+    """Move a batch of pending amounts under a flush token.
+
+    Returns the token and its {(model label, pk, field): delta}. A batch left
+    by an unfinished flush is returned again under its original token.
+    """
+    with write_transaction(conn):
+        token = _get_state(conn, 'flush_token')
+        if token is None:
+            moved = conn.execute(
+                'UPDATE pending_counters SET flushing = amount, amount = 0 WHERE rowid IN ('
+                'SELECT rowid FROM pending_counters WHERE amount != 0 LIMIT ?)',
+                (FLUSH_BATCH_SIZE,),
+            ).rowcount
+            if moved:
+                token = uuid.uuid4().hex
+                _set_state(conn, 'flush_token', token)
+        rows = conn.execute(
+            'SELECT model, object_id, field, flushing FROM pending_counters WHERE flushing != 0'
+        ).fetchall() if token else []
+    return token, {(label, pk, field): delta for label, pk, field, delta in rows}
+
+
+def _apply(token, deltas):
+    try:
+        with transaction.atomic():
+            CounterFlush.objects.create(token=token)
+            for (label, pk, field), delta in deltas.items():
+                apps.get_model(label).objects.filter(pk=pk).update(**{field: F(field) + delta})
+    except IntegrityError:
+        # Another flush already applied this batch
+        pass
+
+
+def _finish_batch(conn, token):
+    with write_transaction(conn):
+        if _get_state(conn, 'flush_token') == token:
+            conn.execute('UPDATE pending_counters SET flushing = 0 WHERE flushing != 0')
+            conn.execute('DELETE FROM pending_counters WHERE amount = 0')
+            conn.execute("DELETE FROM counter_state WHERE key = 'flush_token'")
+
+
+def flush():
+    """Write buffered increments to the database.
+
+    Returns the flushed deltas as {(model label, pk, field): delta}.
+    """
+    conn = _connection()
+    flushed = defaultdict(int)
+    while True:
+        token, deltas = _claim_batch(conn)
+        if token is None:
+            break
+        _apply(token, deltas)
+        _finish_batch(conn, token)
+        for key, delta in deltas.items():
+            flushed[key] += delta
+    _set_state(conn, 'last_flush', time.time())
+    CounterFlush.objects.filter(created_at__lt=timezone.now() - FLUSH_RECORD_RETENTION).delete()
+    return dict(flushed)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = 'Write buffered view and download counters to the database'
+
+    def handle(self, *args, **options):
+        deltas = counters.flush()
+        self.stdout.write(self.style.SUCCESS(
+            f'Flushed {sum(deltas.values())} increments across {len(deltas)} counters'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Model label, e.g. brands.Brand', max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field', models.CharField(max_length=50)),
+                ('amount', models.IntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id', 'field'], name='core_pendin_model_b9618a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def apply_pending_counters(apps, schema_editor):
+    """Fold increments still queued in PendingCounter into their counters."""
+    PendingCounter = apps.get_model('core', 'PendingCounter')
+    totals = (
+        PendingCounter.objects.values('model', 'object_id', 'field')
+        .annotate(total=Sum('amount'))
+    )
+    for row in totals:
+        app_label, model_name = row['model'].split('.')
+        model = apps.get_model(app_label, model_name)
+        model.objects.filter(pk=row['object_id']).update(**{row['field']: F(row['field']) + row['total']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_pendingcounter'),
+        ('brands', '0001_initial'),
+        ('blog', '0001_initial'),
+        ('insights', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounterFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(apply_pending_counters, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='PendingCounter',
+        ),
+    ]
@@ -49,6 +49,10 @@ class ViewTrackingModel(models.Model):
     views_count = models.PositiveIntegerField(default=0)
     likes_count = models.PositiveIntegerField(default=0)
     shares_count = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(
+        null=True, blank=True, editable=False, db_index=True,
+        help_text="Log of time-decayed views, maintained by analytics.trending"
+    )
     
     class Meta:
         abstract = True
@@ -182,3 +186,12 @@ class SiteConfiguration(TimeStampedModel):
             setting.description = description
             setting.save()
         return setting
+
+
+class CounterFlush(models.Model):
+    """Batch of buffered counter increments applied by core.counters.flush."""
+    token = models.CharField(max_length=32, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    def __str__(self):
+        return f"{self.token} ({self.created_at})"
@@ -0,0 +1,56 @@
+"""
+Reusable query expressions.
+"""
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Func, IntegerField, Subquery, Window
+from django.db.models.functions import RowNumber
+
+
+def subquery_count(queryset):
+    """Count the rows of a queryset filtered on OuterRef() as a correlated subquery.
+
+    Unlike annotating with Count() over a join, this does not GROUP BY every
+    column of the outer query.
+    """
+    counts = queryset.order_by().annotate(
+        row_count=Func(F('pk'), function='COUNT')
+    ).values('row_count')
+    return Subquery(counts, output_field=IntegerField())
+
+
+def top_n_per_group(queryset, group_field, n, order_by=None):
+    """Limit a queryset to the first n rows of every group in a single query.
+
+    Rows are numbered with ROW_NUMBER() OVER (PARTITION BY group_field) in the
+    queryset's own ordering unless order_by is given. Prefetches on the
+    queryset run once for all groups.
+    """
+    if order_by is None:
+        order_by = list(queryset.query.order_by or queryset.model._meta.ordering)
+    return queryset.annotate(
+        group_row_number=Window(RowNumber(), partition_by=F(group_field), order_by=order_by)
+    ).filter(group_row_number__lte=n)
+
+
+def count_by(queryset, field):
+    """Count a queryset's rows per value of field with one GROUP BY query."""
+    return dict(queryset.order_by().values_list(field).annotate(row_count=Count('pk')))
+
+
+@contextmanager
+def consistent_read():
+    """Run a block's queries in one transaction that sees one point in time.
+
+    PostgreSQL's default READ COMMITTED takes a new snapshot per statement,
+    so the transaction is raised to REPEATABLE READ there. SQLite
+    connections run in WAL mode (see core.signals), where the snapshot does
+    not block writers.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        yield
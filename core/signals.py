@@ -0,0 +1,21 @@
+"""
+Core signal handlers.
+
+SQLite connections are switched to WAL journaling, so long read
+transactions such as backup exports take a snapshot instead of blocking
+writers, and writers no longer block readers.
+"""
+from django.db.backends.signals import connection_created
+
+
+def enable_sqlite_wal(sender, connection, **kwargs):
+    """Use write-ahead logging on every new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+
+
+def connect_signals():
+    connection_created.connect(enable_sqlite_wal, dispatch_uid='core_sqlite_wal')
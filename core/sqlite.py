@@ -0,0 +1,46 @@
+"""
+Connections to the SQLite side databases shared by worker processes.
+
+The counter buffer and the analytics event spool live in their own SQLite
+files in WAL mode, so requests can write to them without taking the main
+database's write lock.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+_local = threading.local()
+
+
+def connect(path, schema=()):
+    """Get this thread's autocommit connection to path, reopening it after a fork.
+
+    The schema statements run whenever a connection is opened, so they
+    should be idempotent (CREATE ... IF NOT EXISTS).
+    """
+    path = str(path)
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.connections, _local.pid = {}, os.getpid()
+    conn = _local.connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in schema:
+            conn.execute(statement)
+        _local.connections[path] = conn
+    return conn
+
+
+@contextmanager
+def write_transaction(conn):
+    """Run a block in a transaction that holds the write lock from the start."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
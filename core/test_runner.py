@@ -0,0 +1,39 @@
+"""
+Test runner that keeps tests away from the developer's local data.
+
+The SQLite cache, the counter database and the event spool are files
+shared by every process, so tests run against throwaway copies in a
+temporary directory instead of reading, bumping and clearing the real ones.
+"""
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner with a temporary cache, counter database and event spool."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        caches = {}
+        for alias, config in settings.CACHES.items():
+            config = dict(config)
+            if config['BACKEND'] == 'core.cache_backends.SQLiteCache':
+                config['LOCATION'] = str(tmp / f'cache-{alias}.sqlite3')
+            caches[alias] = config
+        self._override = override_settings(
+            CACHES=caches,
+            COUNTER_DATABASE=str(tmp / 'counters.sqlite3'),
+            ANALYTICS_SPOOL=str(tmp / 'events.sqlite3'),
+        )
+        self._override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._override.disable()
+        self._tmp.cleanup()
+        super().teardown_test_environment(**kwargs)
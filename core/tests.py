@@ -1,3 +1,208 @@
-from django.test import TestCase
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.db.models.query import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from brands.models import Brand
+
+from . import counters
+from .cache import bump_version, versioned_local
+from .cache_backends import SQLiteCache
+from .models import CounterFlush
+from .utils import format_amount, format_percent, parse_amount, parse_percent
+
+
+class ParseAmountTests(SimpleTestCase):
+    def test_units_and_currency(self):
+        self.assertEqual(parse_amount('₦4.2T'), Decimal('4200000000000.00'))
+        self.assertEqual(parse_amount('₦684 Billion'), Decimal('684000000000.00'))
+        self.assertEqual(parse_amount('NGN 1,250m'), Decimal('1250000000.00'))
+        self.assertEqual(parse_amount('2500000'), Decimal('2500000.00'))
+        self.assertEqual(parse_amount('-₦3B'), Decimal('-3000000000.00'))
+        self.assertEqual(parse_amount('.5k'), Decimal('500.00'))
+
+    def test_unrecognised_values(self):
+        for value in [None, '', 'N/A', '1e5', '₦4.2X', '4.2.1T', 'NaN', 'Infinity']:
+            with self.subTest(value=value):
+                self.assertIsNone(parse_amount(value))
+
+    def test_values_beyond_column_precision(self):
+        # max_digits=20 with 2 decimal places leaves 18 integer digits
+        self.assertEqual(parse_amount('9' * 18), Decimal('9' * 18 + '.00'))
+        self.assertIsNone(parse_amount('1' + '0' * 18))
+        self.assertIsNone(parse_amount('9' * 30 + 'T'))
+        self.assertIsNone(parse_amount('9' * 60))
+
+
+class ParsePercentTests(SimpleTestCase):
+    def test_signed_percentages(self):
+        self.assertEqual(parse_percent('+12.5%'), Decimal('12.50'))
+        self.assertEqual(parse_percent('-3'), Decimal('-3.00'))
+        self.assertEqual(parse_percent('0.125%'), Decimal('0.12'))
+
+    def test_unrecognised_values(self):
+        for value in [None, '', '%', 'twelve', '12%%']:
+            with self.subTest(value=value):
+                self.assertIsNone(parse_percent(value))
+
+    def test_values_beyond_column_precision(self):
+        # max_digits=8 with 2 decimal places leaves 6 integer digits
+        self.assertEqual(parse_percent('999999.99'), Decimal('999999.99'))
+        self.assertIsNone(parse_percent('1000000'))
+        self.assertIsNone(parse_percent('9' * 40 + '%'))
+
+
+class FormatTests(SimpleTestCase):
+    def test_round_trip(self):
+        self.assertEqual(format_amount(parse_amount('₦25.8T')), '₦25.8T')
+        self.assertEqual(format_percent(parse_percent('+12.3%')), '+12.3%')
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(COUNTER_DATABASE=Path(tmp.name) / 'counters.sqlite3')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.brand = Brand.objects.create(
+            title='Acme', slug='acme', description='x', full_description='x',
+            current_rank=1, brand_value='₦1T', growth_rate='+1%', views_count=10,
+        )
+
+    def views(self):
+        self.brand.refresh_from_db(fields=['views_count'])
+        return self.brand.views_count
+
+    def test_increment_buffers_without_writing_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.increment(self.brand, 'views_count'), 1)
+            self.assertEqual(counters.increment(self.brand, 'views_count', 2), 3)
+        self.assertEqual(self.views(), 10)
+        self.assertEqual(counters.live_count(self.brand, 'views_count'), 13)
+
+    def test_flush_applies_each_increment_once(self):
+        for _ in range(3):
+            counters.increment(self.brand, 'views_count')
+        self.assertEqual(counters.flush(), {('brands.Brand', self.brand.pk, 'views_count'): 3})
+        self.assertEqual(counters.flush(), {})
+        self.assertEqual(self.views(), 13)
+        self.assertEqual(counters.pending_count(self.brand, 'views_count'), 0)
+
+    def test_flush_in_batches(self):
+        other = Brand.objects.create(
+            title='Other', slug='other', description='x', full_description='x',
+            current_rank=2, brand_value='₦1T', growth_rate='+1%',
+        )
+        for brand in (self.brand, other):
+            counters.increment(brand, 'views_count', 5)
+        with mock.patch.object(counters, 'FLUSH_BATCH_SIZE', 1):
+            counters.flush()
+        self.assertEqual(self.views(), 15)
+        self.assertEqual(CounterFlush.objects.count(), 2)
+
+    def test_failed_flush_is_finished_by_the_next(self):
+        counters.increment(self.brand, 'views_count', 4)
+        with mock.patch.object(QuerySet, 'update', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                counters.flush()
+        # The counter update rolled back with the failed flush
+        self.assertEqual(self.views(), 10)
+        counters.increment(self.brand, 'views_count')
+        self.assertEqual(counters.pending_count(self.brand, 'views_count'), 5)
+        counters.flush()
+        self.assertEqual(self.views(), 15)
+
+    def test_batch_applied_before_a_crash_is_not_applied_again(self):
+        counters.increment(self.brand, 'views_count', 4)
+        with mock.patch.object(counters, '_finish_batch', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                counters.flush()
+        self.assertEqual(self.views(), 14)
+        counters.flush()
+        self.assertEqual(self.views(), 14)
+        self.assertEqual(counters.pending_count(self.brand, 'views_count'), 0)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = SQLiteCache(Path(tmp.name) / 'cache.sqlite3', {'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 4}})
+        self.cache.touch_interval = 0
+
+    def accessed(self, key):
+        key = self.cache.make_key(key)
+        return self.cache._connection().execute(
+            'SELECT accessed FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()[0]
+
+    def age(self, key, seconds):
+        self.cache._connection().execute(
+            'UPDATE cache_entries SET accessed = accessed - ? WHERE key = ?', (seconds, self.cache.make_key(key))
+        )
+
+    def test_get_many_refreshes_accessed(self):
+        self.cache.set_many({'a': 1, 'b': {'x': 2}})
+        self.age('a', 60)
+        before = self.accessed('a')
+        self.assertEqual(self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': {'x': 2}})
+        self.assertGreater(self.accessed('a'), before)
+
+    def test_incr(self):
+        self.cache.set('n', 1)
+        self.assertEqual(self.cache.incr('n', 5), 6)
+        self.assertEqual(self.cache.get('n'), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_add_only_sets_missing_or_expired_keys(self):
+        self.assertTrue(self.cache.add('k', 'first'))
+        self.assertFalse(self.cache.add('k', 'second'))
+        self.assertEqual(self.cache.get('k'), 'first')
+        self.cache.set('old', 'stale', timeout=-1)
+        self.assertTrue(self.cache.add('old', 'fresh'))
+        self.assertEqual(self.cache.get('old'), 'fresh')
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set('gone', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertEqual(self.cache.get_many(['gone']), {})
+        self.assertFalse(self.cache.has_key('gone'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('gone')
+
+    def test_cull_drops_least_recently_used(self):
+        for i in range(5):
+            self.cache.set(f'k{i}', i)
+            self.age(f'k{i}', 100 - i)
+        # Reading k0 makes k1 and k2 the least recently used
+        self.cache.get_many(['k0'])
+        self.cache._cull()
+        # One entry over MAX_ENTRIES, plus a quarter of MAX_ENTRIES
+        self.assertEqual(self.cache.get_many([f'k{i}' for i in range(5)]), {'k0': 0, 'k3': 3, 'k4': 4})
+
+    def test_clear(self):
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+
+class VersionedLocalTests(SimpleTestCase):
+    def test_reloads_after_a_version_bump(self):
+        loads = []
+        squares = versioned_local('tests', lambda n: loads.append(n) or n * n, maxsize=2)
+        self.assertEqual(squares(3), 9)
+        self.assertEqual(squares(3), 9)
+        self.assertEqual(loads, [3])
+        bump_version('tests')
+        self.assertEqual(squares(3), 9)
+        self.assertEqual(loads, [3, 3])
+        # Beyond maxsize the cache starts over
+        squares(4)
+        squares(5)
+        squares(3)
+        self.assertEqual(loads, [3, 3, 4, 5, 3])
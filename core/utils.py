@@ -0,0 +1,129 @@
+"""
+Parsing and formatting helpers for the display strings stored on brands,
+e.g. "₦4.2T", "₦684 Billion" and "+12.5%".
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+
+AMOUNT_MULTIPLIERS = {
+    '': 1,
+    'k': 10 ** 3,
+    'thousand': 10 ** 3,
+    'm': 10 ** 6,
+    'million': 10 ** 6,
+    'b': 10 ** 9,
+    'bn': 10 ** 9,
+    'billion': 10 ** 9,
+    't': 10 ** 12,
+    'tn': 10 ** 12,
+    'trillion': 10 ** 12,
+}
+
+AMOUNT_RE = re.compile(
+    r'^(?P<sign>[+-])?\s*(?:₦|NGN)?\s*(?P<number>\d[\d,]*(?:\.\d+)?|\.\d+)\s*(?P<unit>[a-z]*)$',
+    re.IGNORECASE,
+)
+
+PERCENT_RE = re.compile(r'^(?P<number>[+-]?\s*(?:\d[\d,]*(?:\.\d+)?|\.\d+))\s*%?$')
+
+# Precision of the columns parsed values are stored in (two decimal places)
+AMOUNT_MAX_DIGITS = 20
+PERCENT_MAX_DIGITS = 8
+
+
+def _to_decimal(number):
+    try:
+        return Decimal(number.replace(',', '').replace(' ', ''))
+    except InvalidOperation:
+        return None
+
+
+def _to_column(number, max_digits):
+    """Round to two decimal places, or None if it will not fit max_digits."""
+    try:
+        number = number.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+    if abs(number) >= Decimal(10) ** (max_digits - 2):
+        return None
+    return number
+
+
+def parse_amount(value):
+    """Parse a naira amount such as "₦4.2T" or "₦684 Billion" into a Decimal.
+
+    Returns None for blank, unrecognised or out of range values.
+    """
+    if value is None:
+        return None
+    match = AMOUNT_RE.match(str(value).strip())
+    if not match:
+        return None
+    multiplier = AMOUNT_MULTIPLIERS.get(match.group('unit').lower())
+    number = _to_decimal(match.group('number'))
+    if multiplier is None or number is None:
+        return None
+    amount = number * multiplier
+    if match.group('sign') == '-':
+        amount = -amount
+    return _to_column(amount, AMOUNT_MAX_DIGITS)
+
+
+def parse_percent(value):
+    """Parse a signed percentage such as "+12.5%" into a Decimal (12.5).
+
+    Returns None for blank, unrecognised or out of range values.
+    """
+    if value is None:
+        return None
+    match = PERCENT_RE.match(str(value).strip())
+    if not match:
+        return None
+    number = _to_decimal(match.group('number'))
+    if number is None:
+        return None
+    return _to_column(number, PERCENT_MAX_DIGITS)
+
+
+def format_amount(amount, currency='₦'):
+    """Format a naira amount for display, e.g. Decimal('25800000000000') -> "₦25.8T"."""
+    if amount is None:
+        return 'N/A'
+    amount = Decimal(amount)
+    sign = '-' if amount < 0 else ''
+    amount = abs(amount)
+    for suffix, multiplier in (('T', 10 ** 12), ('B', 10 ** 9), ('M', 10 ** 6), ('K', 10 ** 3)):
+        if amount >= multiplier:
+            scaled = (amount / multiplier).quantize(Decimal('0.1'))
+            return f'{sign}{currency}{scaled.normalize():f}{suffix}'
+    return f'{sign}{currency}{amount.quantize(Decimal("1")):f}'
+
+
+def format_percent(value):
+    """Format a percentage for display, e.g. Decimal('12.3') -> "+12.3%"."""
+    if value is None:
+        return 'N/A'
+    value = Decimal(value).quantize(Decimal('0.1'))
+    sign = '+' if value >= 0 else ''
+    return f'{sign}{value:f}%'
+
+
+def parse_metric(value):
+    """Parse a free-form metric value such as "77M+", "65%" or "500+" into a Decimal.
+
+    Percentages keep their percent value; trailing "+" and unit words the
+    amount parser does not know (e.g. "48Mt") are tolerated. Returns None
+    for values with no leading number.
+    """
+    if value is None:
+        return None
+    text = str(value).strip().rstrip('+').strip()
+    if text.endswith('%'):
+        return parse_percent(text)
+    number = parse_amount(text)
+    if number is None:
+        match = re.match(r'^(.*?\d)\s*([a-z]?)[a-z]*$', text, re.IGNORECASE)
+        if match:
+            number = parse_amount(match.group(1) + match.group(2)) or parse_amount(match.group(1))
+    return number
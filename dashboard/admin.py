@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import YearlyRanking, DashboardUser, DataMigrationLog, SystemConfiguration
+from .models import (
+    YearlyRanking, DashboardUser, DataMigrationLog, SystemConfiguration, BackgroundJob, RevokedToken, Tombstone,
+)
 
 
 @admin.register(YearlyRanking)
@@ -37,6 +39,9 @@ class YearlyRankingAdmin(admin.ModelAdmin):
     )
     
     filter_horizontal = ['team_members']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_counts()
 
 
 @admin.register(DashboardUser)
@@ -117,3 +122,26 @@ class SystemConfigurationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['job_type', 'status', 'attempts', 'progress', 'created_by', 'created_at', 'completed_at']
+    list_filter = ['job_type', 'status']
+    readonly_fields = ['heartbeat_at', 'worker', 'started_at', 'completed_at', 'created_at', 'updated_at']
+    ordering = ['-created_at']
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ['model', 'object_pk', 'deleted_at']
+    list_filter = ['model']
+    search_fields = ['object_pk']
+    readonly_fields = ['model', 'object_pk', 'deleted_at']
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ['token_id', 'expires_at']
+    search_fields = ['token_id']
+    readonly_fields = ['token_id', 'expires_at']
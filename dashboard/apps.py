@@ -5,4 +5,8 @@ class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
     verbose_name = 'Dashboard Management'
-    label = 'dashboard'
\ No newline at end of file
+    label = 'dashboard'
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
@@ -10,6 +10,10 @@ from django.utils.decorators import method_decorator
 from django.views import View
 import json
 
+from django.conf import settings
+
+from .authentication import TOKEN_COOKIE, issue_token, request_token, revoke_token
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -42,12 +46,11 @@ def login_view(request):
                 request.session['is_authenticated'] = True
                 request.session.save()
 
-                print(f"🔧 Created session: {request.session.session_key}")
-                print(f"🔧 Session data: {dict(request.session)}")
-
+                token = issue_token(user)
                 response = JsonResponse({
                     'success': True,
-                    'session_key': request.session.session_key,  # For debugging
+                    'token': token,
+                    'expires_in': settings.DASHBOARD_TOKEN_MAX_AGE,
                     'user': {
                         'id': user.id,
                         'username': user.username,
@@ -64,28 +67,26 @@ def login_view(request):
 
                 # Standard Django session cookie
                 response.set_cookie(
-                    'sessionid',
+                    settings.SESSION_COOKIE_NAME,
                     session_key,
-                    max_age=86400,
-                    httponly=False,
-                    samesite=None,
-                    secure=False,
+                    max_age=settings.SESSION_COOKIE_AGE,
+                    httponly=True,
+                    samesite=settings.SESSION_COOKIE_SAMESITE,
+                    secure=settings.SESSION_COOKIE_SECURE,
                     domain=None
                 )
 
-                # Alternative cookie for cross-origin
+                # Dashboard token cookie for cross-origin; never readable from scripts
                 response.set_cookie(
-                    'dashboard_session',
-                    session_key,
-                    max_age=86400,
-                    httponly=False,
-                    samesite=None,
-                    secure=False,
+                    TOKEN_COOKIE,
+                    token,
+                    max_age=settings.DASHBOARD_TOKEN_MAX_AGE,
+                    httponly=True,
+                    samesite=settings.SESSION_COOKIE_SAMESITE,
+                    secure=settings.SESSION_COOKIE_SECURE,
                     domain=None
                 )
 
-                print(f"🍪 Set cookies: sessionid={session_key}")
-
                 return response
             else:
                 return JsonResponse({
@@ -112,8 +113,13 @@ def logout_view(request):
     """
     Handle dashboard logout
     """
+    token = request_token(request)
+    if token:
+        revoke_token(token)
     logout(request)
-    return JsonResponse({'success': True})
+    response = JsonResponse({'success': True})
+    response.delete_cookie(TOKEN_COOKIE)
+    return response
 
 
 @require_http_methods(["GET"])
@@ -148,12 +154,6 @@ def dashboard_stats_view(request):
     """
     Get dashboard statistics (existing functionality)
     """
-    # Debug session info
-    print(f"🔍 Session key: {request.session.session_key}")
-    print(f"🔍 Session data: {dict(request.session)}")
-    print(f"🔍 User: {request.user}")
-    print(f"🔍 Cookies: {request.COOKIES}")
-
     # Check if user is authenticated
     if not request.user.is_authenticated:
         return JsonResponse({
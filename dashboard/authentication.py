@@ -0,0 +1,147 @@
+"""
+Bearer tokens for the dashboard API.
+
+A token is a signed, timestamped payload naming a user and a random token
+id, so checking one needs no database row. Each process caches the staff
+users it resolves for DASHBOARD_USER_CACHE_SECONDS, and the token ids it has
+already checked against the RevokedToken table, both tagged with the
+'dashboard_auth' version stamp. Logging out records the token id in the
+table and bumps the stamp; so does saving or deleting a user. Revocations
+live in the database rather than the cache, so clearing or culling the cache
+only costs a re-check, and a token whose revocation cannot be checked is
+refused. On the warm path a request costs one version stamp lookup and no
+database queries.
+"""
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication, SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.cache import bump_version_on_commit, versioned_local
+
+from .models import RevokedToken
+
+
+AUTH_NAMESPACE = 'dashboard_auth'
+TOKEN_SALT = 'dashboard.token'
+TOKEN_COOKIE = 'dashboard_session'
+
+# Process-wide cache of resolved users and checked token ids, emptied when
+# the 'dashboard_auth' version stamp changes
+_auth_state = versioned_local(AUTH_NAMESPACE, lambda: {'users': {}, 'tokens': set()})
+
+
+def issue_token(user):
+    """Create a signed dashboard token for a user."""
+    return signing.dumps({'u': user.pk, 'j': secrets.token_hex(8)}, salt=TOKEN_SALT)
+
+
+def _load(token):
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=settings.DASHBOARD_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if not isinstance(payload, dict) or 'u' not in payload or 'j' not in payload:
+        return None
+    return payload
+
+
+def revoke_token(token):
+    """Revoke a token until it would have expired anyway."""
+    payload = _load(token)
+    if payload is None:
+        return False
+    now = timezone.now()
+    RevokedToken.objects.filter(expires_at__lt=now).delete()
+    RevokedToken.objects.get_or_create(
+        token_id=payload['j'],
+        defaults={'expires_at': now + timedelta(seconds=settings.DASHBOARD_TOKEN_MAX_AGE)},
+    )
+    bump_version_on_commit(AUTH_NAMESPACE)
+    return True
+
+
+def resolve_token(token):
+    """Get the active staff user a token belongs to, or None."""
+    payload = _load(token)
+    if payload is None:
+        return None
+    state = _auth_state()
+
+    token_id = payload['j']
+    if token_id not in state['tokens']:
+        try:
+            revoked = RevokedToken.objects.filter(token_id=token_id).exists()
+        except DatabaseError:
+            return None
+        if revoked:
+            return None
+        state['tokens'].add(token_id)
+
+    now = time.monotonic()
+    entry = state['users'].get(payload['u'])
+    if entry is None or entry[0] < now:
+        user = User.objects.filter(pk=payload['u'], is_active=True, is_staff=True).first()
+        values = None
+        if user is not None:
+            values = tuple(getattr(user, field.attname) for field in User._meta.concrete_fields)
+        entry = (now + settings.DASHBOARD_USER_CACHE_SECONDS, values)
+        state['users'][payload['u']] = entry
+
+    if entry[1] is None:
+        return None
+    # A fresh instance per request, so nothing cached on it leaks between requests
+    return User.from_db(
+        DEFAULT_DB_ALIAS, [field.attname for field in User._meta.concrete_fields], entry[1]
+    )
+
+
+def bearer_token(request):
+    """Get the token from a request's Authorization header."""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[7:].strip() or None
+    return None
+
+
+def request_token(request):
+    """Get the token from the Authorization header or the token cookie."""
+    return bearer_token(request) or request.COOKIES.get(TOKEN_COOKIE)
+
+
+def authenticate_request(request):
+    """Resolve a request's dashboard token once and remember the result on it."""
+    if not hasattr(request, '_dashboard_token_user'):
+        token = request_token(request)
+        request._dashboard_token_user = resolve_token(token) if token else None
+    return request._dashboard_token_user
+
+
+class DashboardTokenAuthentication(BaseAuthentication):
+    """DRF authentication for requests with a dashboard bearer token.
+    
+    Only the Authorization header is accepted here: a token sent as a cookie
+    is left to SessionAuthentication, which enforces CSRF. Used only by the
+    dashboard views, so a stale token never locks a client out of the
+    public API.
+    """
+    
+    def authenticate(self, request):
+        token = bearer_token(request._request)
+        if token is None:
+            return None
+        user = authenticate_request(request._request)
+        if user is None:
+            raise AuthenticationFailed('Invalid or expired token.')
+        return user, token
+
+
+# Authentication for dashboard API views
+DASHBOARD_AUTHENTICATION_CLASSES = [DashboardTokenAuthentication, SessionAuthentication]
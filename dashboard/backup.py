@@ -0,0 +1,433 @@
+"""
+Streaming backups.
+
+A backup is a directory under BACKUP_ROOT holding one gzip-compressed NDJSON
+file per model and a manifest.json. Each model is read in primary-key order
+a chunk at a time and written a line per row, so memory use does not grow
+with the size of the database. The manifest lists the models in dependency
+order with each file's row count and the SHA-256 of its uncompressed lines.
+
+Rows use Django's serialization format with natural foreign keys, so content
+types and permissions (which are not backed up) are matched by name on
+restore. Media files are optionally copied into a content-addressed store
+shared by all backups, BACKUP_ROOT/media/<sha256[:2]>/<sha256>, so a file is
+stored once however many backups include it.
+
+A full backup is a snapshot of every model. An incremental backup holds only
+the rows changed since its parent backup's watermark, plus tombstones for
+rows deleted since then, and names its parent; restoring it replays the
+chain from the base snapshot forward.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.utils import timezone
+
+from core.queries import consistent_read
+
+from .models import Tombstone
+
+
+FORMAT = 'top50-backup'
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+MEDIA_INDEX_NAME = 'media.ndjson.gz'
+TOMBSTONES_NAME = 'tombstones.ndjson.gz'
+LAST_RESTORE_NAME = 'last_restore.json'
+MEDIA_STORE_NAME = 'media'
+PARTIAL_SUFFIX = '.partial'
+
+# Entries of BACKUP_ROOT that are not backups
+RESERVED_NAMES = {MEDIA_STORE_NAME, LAST_RESTORE_NAME}
+
+# Rebuilt by migrate, per-request state, or the job queue running the backup
+EXCLUDED_MODELS = {
+    'contenttypes.contenttype', 'auth.permission', 'sessions.session',
+    'dashboard.backgroundjob', 'dashboard.tombstone',
+}
+
+# Append-only models, exported incrementally by primary key
+APPEND_ONLY_MODELS = {'analytics.event'}
+
+# Incrementals re-read rows changed shortly before the parent's watermark,
+# so rows committed by transactions still open when it was taken are not
+# missed; restoring a row twice is harmless.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+NAME_RE = re.compile(r'^[\w-][\w.-]*$')
+
+
+class BackupError(ValueError):
+    """Raised for invalid backup names or unreadable backups."""
+
+
+def backup_root():
+    return Path(settings.BACKUP_ROOT)
+
+
+def backup_path(name):
+    """Get the directory of a named backup, refusing names that leave BACKUP_ROOT."""
+    if not name or not NAME_RE.match(name):
+        raise BackupError(f'Invalid backup name "{name}"')
+    if name in RESERVED_NAMES or name.endswith(PARTIAL_SUFFIX):
+        raise BackupError(f'"{name}" is a reserved name')
+    return backup_root() / name
+
+
+def media_store_path(digest):
+    return backup_root() / MEDIA_STORE_NAME / digest[:2] / digest
+
+
+def backup_models():
+    """Get the models included in backups, in dependency order."""
+    app_list = [
+        (config, [
+            model for model in config.get_models()
+            if model._meta.label_lower not in EXCLUDED_MODELS and not model._meta.proxy
+        ])
+        for config in apps.get_app_configs()
+    ]
+    return serializers.sort_dependencies(app_list, allow_cycles=True)
+
+
+def incremental_field(model):
+    """Get the field incremental backups select a model's changed rows by.
+
+    Returns None for models that are copied whole every time.
+    """
+    if model._meta.label_lower in APPEND_ONLY_MODELS:
+        return 'pk'
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        return 'updated_at'
+    return None
+
+
+def read_manifest(name):
+    """Load a backup's manifest."""
+    path = backup_path(name) / MANIFEST_NAME
+    try:
+        with open(path) as fh:
+            manifest = json.load(fh)
+    except FileNotFoundError:
+        raise BackupError(f'Backup "{name}" does not exist')
+    if manifest.get('format') != FORMAT:
+        raise BackupError(f'Backup "{name}" is not a {FORMAT} backup')
+    return manifest
+
+
+def record_restore(name):
+    """Note that the database was restored from a backup.
+
+    Changes since earlier backups no longer describe the database, so the
+    next backup has to be a full one.
+    """
+    backup_root().mkdir(parents=True, exist_ok=True)
+    with open(backup_root() / LAST_RESTORE_NAME, 'w') as fh:
+        json.dump({'backup': name, 'restored_at': timezone.now().isoformat()}, fh)
+
+
+def last_restore():
+    try:
+        with open(backup_root() / LAST_RESTORE_NAME) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def list_backups():
+    """Get the manifests of all complete backups, oldest first."""
+    manifests = []
+    root = backup_root()
+    if root.is_dir():
+        for path in root.iterdir():
+            if (path / MANIFEST_NAME).is_file():
+                try:
+                    manifests.append(read_manifest(path.name))
+                except (BackupError, ValueError):
+                    continue
+    return sorted(manifests, key=lambda manifest: manifest['created_at'])
+
+
+def latest_backup():
+    backups = list_backups()
+    return backups[-1] if backups else None
+
+
+def backup_chain(name):
+    """Get the manifests a backup depends on, from its base snapshot to itself."""
+    chain = [read_manifest(name)]
+    while chain[-1]['kind'] != 'full':
+        if len(chain) > 1000:
+            raise BackupError(f'Backup chain of "{name}" does not end in a full backup')
+        chain.append(read_manifest(chain[-1]['parent']))
+    return chain[::-1]
+
+
+def read_rows(name, filename):
+    """Iterate over the rows of one of a backup's NDJSON files."""
+    with gzip.open(backup_path(name) / filename, 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+class _BackupJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that keeps microseconds, so restored timestamps match the originals."""
+    
+    def default(self, o):
+        if isinstance(o, datetime):
+            value = o.isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return super().default(o)
+
+
+class _NDJSONWriter:
+    """Write JSON lines to a gzip file, counting and hashing them."""
+    
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._hash = hashlib.sha256()
+        self._file = gzip.open(path, 'wb', compresslevel=6)
+    
+    def write(self, obj):
+        line = (json.dumps(obj, cls=_BackupJSONEncoder, ensure_ascii=False) + '\n').encode()
+        self._hash.update(line)
+        self._file.write(line)
+        self.rows += 1
+    
+    def close(self):
+        self._file.close()
+        return {
+            'file': self.path.name,
+            'rows': self.rows,
+            'sha256': self._hash.hexdigest(),
+            'bytes': self.path.stat().st_size,
+        }
+
+
+def write_queryset(directory, model, queryset, chunk_size, on_chunk=None):
+    """Stream a queryset to <directory>/<app>.<model>.ndjson.gz.
+
+    Rows are paged by primary key rather than with OFFSET, so each chunk is
+    an index range scan however deep into the table it is.
+    """
+    m2m = [field.name for field in model._meta.many_to_many if field.serialize]
+    queryset = queryset.order_by('pk').prefetch_related(*m2m)
+    writer = _NDJSONWriter(directory / f'{model._meta.label_lower}.ndjson.gz')
+    try:
+        last_pk = None
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            for obj in serializers.serialize('python', chunk, use_natural_foreign_keys=True):
+                writer.write(obj)
+            if on_chunk is not None:
+                on_chunk(len(chunk))
+    finally:
+        entry = writer.close()
+    entry['model'] = model._meta.label_lower
+    return entry
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_media(directory, since=None):
+    """Copy MEDIA_ROOT into the content-addressed store and index it.
+
+    With since (a timestamp), only files modified after it are indexed.
+    """
+    media_root = Path(settings.MEDIA_ROOT)
+    writer = _NDJSONWriter(directory / MEDIA_INDEX_NAME)
+    total_bytes = 0
+    try:
+        for dirpath, dirnames, filenames in os.walk(media_root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = Path(dirpath) / filename
+                stat = path.stat()
+                if since is not None and stat.st_mtime <= since:
+                    continue
+                digest = _hash_file(path)
+                stored = media_store_path(digest)
+                if not stored.exists():
+                    stored.parent.mkdir(parents=True, exist_ok=True)
+                    partial = stored.with_name(stored.name + '.partial')
+                    shutil.copyfile(path, partial)
+                    os.replace(partial, stored)
+                writer.write({
+                    'path': path.relative_to(media_root).as_posix(),
+                    'sha256': digest,
+                    'size': stat.st_size,
+                })
+                total_bytes += stat.st_size
+    finally:
+        entry = writer.close()
+    entry['media_bytes'] = total_bytes
+    return entry
+
+
+def write_tombstones(directory, tombstones):
+    """Write deletions to tombstones.ndjson.gz."""
+    writer = _NDJSONWriter(directory / TOMBSTONES_NAME)
+    try:
+        for model, object_pk in tombstones.order_by('pk').values_list('model', 'object_pk').iterator():
+            writer.write({'model': model, 'pk': object_pk})
+    finally:
+        entry = writer.close()
+    return entry
+
+
+def write_backup(name, querysets, extra, tombstones=None, include_media=False, media_since=None,
+                 chunk_size=None, progress=None):
+    """Write a backup of the given (model, queryset, mode) triples and return its manifest.
+
+    mode is 'snapshot' when the queryset holds every row of the model and
+    'changes' when it only holds rows changed since the parent backup.
+    The backup is written to a .partial directory and renamed when complete,
+    so an interrupted backup is never mistaken for a finished one.
+    progress, when given, is called with (rows_done, rows_total, model_label).
+    """
+    directory = backup_path(name)
+    if directory.exists():
+        raise BackupError(f'Backup "{name}" already exists')
+    partial = directory.with_name(directory.name + PARTIAL_SUFFIX)
+    shutil.rmtree(partial, ignore_errors=True)
+    partial.mkdir(parents=True)
+    chunk_size = chunk_size or settings.BACKUP_CHUNK_SIZE
+
+    total = sum(queryset.count() for model, queryset, mode in querysets) if progress else 0
+    done = 0
+    entries = []
+    try:
+        for model, queryset, mode in querysets:
+            def on_chunk(rows, label=model._meta.label_lower):
+                nonlocal done
+                done += rows
+                progress(done, total, label)
+            entry = write_queryset(
+                partial, model, queryset, chunk_size, on_chunk=on_chunk if progress else None
+            )
+            entry['mode'] = mode
+            entries.append(entry)
+
+        manifest = {
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'name': name,
+            **extra,
+            'models': entries,
+            'tombstones': write_tombstones(partial, tombstones) if tombstones is not None else None,
+            'media': write_media(partial, since=media_since) if include_media else None,
+        }
+        with open(partial / MANIFEST_NAME, 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(partial, directory)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    return manifest
+
+
+def _last_pks():
+    return {
+        model._meta.label_lower: model._base_manager.aggregate(last=Max('pk'))['last'] or 0
+        for model in backup_models() if incremental_field(model) == 'pk'
+    }
+
+
+def create_backup(name, include_media=False, chunk_size=None, progress=None):
+    """Write a full backup of every backed-up model.
+
+    Tombstones older than the backup are no longer needed by any later
+    incremental, so they are pruned once it is written.
+    """
+    watermark = timezone.now() - WATERMARK_OVERLAP
+    with consistent_read():
+        last_pks = _last_pks()
+        querysets = []
+        for model in backup_models():
+            queryset = model._base_manager.all()
+            label = model._meta.label_lower
+            if label in last_pks:
+                queryset = queryset.filter(pk__lte=last_pks[label])
+            querysets.append((model, queryset, 'snapshot'))
+
+        manifest = write_backup(name, querysets, {
+            'kind': 'full',
+            'created_at': timezone.now().isoformat(),
+            'parent': None,
+            'base': name,
+            'watermark': watermark.isoformat(),
+            'last_pks': last_pks,
+        }, include_media=include_media, chunk_size=chunk_size, progress=progress)
+    Tombstone.objects.filter(deleted_at__lt=watermark).delete()
+    return manifest
+
+
+def create_incremental(name, parent=None, include_media=False, chunk_size=None, progress=None):
+    """Write the rows changed and deleted since the parent backup.
+
+    parent defaults to the latest backup. Rows are selected by updated_at
+    (or by primary key for append-only models) against the parent's
+    watermark; models with neither are copied whole. Deletions come from
+    tombstones recorded since the watermark.
+    """
+    parent = read_manifest(parent) if parent else latest_backup()
+    if parent is None:
+        raise BackupError('An incremental backup needs a full backup to build on')
+    restore = last_restore()
+    if restore and restore['restored_at'] > parent['created_at']:
+        raise BackupError(
+            f'The database was restored from "{restore["backup"]}" after "{parent["name"]}"; '
+            'take a full backup first'
+        )
+    since = datetime.fromisoformat(parent['watermark'])
+    watermark = timezone.now() - WATERMARK_OVERLAP
+    with consistent_read():
+        last_pks = _last_pks()
+
+        querysets = []
+        for model in backup_models():
+            queryset = model._base_manager.all()
+            label = model._meta.label_lower
+            field = incremental_field(model)
+            if field == 'pk':
+                queryset = queryset.filter(pk__gt=parent['last_pks'].get(label, 0), pk__lte=last_pks[label])
+                querysets.append((model, queryset, 'changes'))
+            elif field:
+                querysets.append((model, queryset.filter(**{f'{field}__gte': since}), 'changes'))
+            else:
+                querysets.append((model, queryset, 'snapshot'))
+
+        return write_backup(name, querysets, {
+            'kind': 'incremental',
+            'created_at': timezone.now().isoformat(),
+            'parent': parent['name'],
+            'base': parent['base'],
+            'watermark': watermark.isoformat(),
+            'last_pks': last_pks,
+        }, tombstones=Tombstone.objects.filter(deleted_at__gte=since),
+            include_media=include_media, media_since=since.timestamp(),
+            chunk_size=chunk_size, progress=progress)
@@ -0,0 +1,207 @@
+"""
+Database-backed background jobs.
+
+Views enqueue a BackgroundJob row and return its id straight away; the
+``run_jobs`` management command claims pending jobs and runs their handlers
+in a thread pool. Workers heartbeat the jobs they hold, jobs whose worker
+stops heartbeating are handed to another worker, and failed jobs are retried
+with exponential backoff until max_attempts is reached.
+
+Handlers are registered with the ``register_job`` decorator and receive the job; they
+return a JSON-serializable result and may call ``job.report_progress()``. A
+handler may also register an ``on_failure`` callback, called with the job
+once it has failed for good.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from rankings.simulation import run_stability
+
+from .backup import backup_path, create_backup, create_incremental
+from .models import BackgroundJob, DataMigrationLog
+from .restore import restore_backup, restore_file
+from .rollover import rollover_year
+
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+JOB_FAILURE_HANDLERS = {}
+
+
+def register_job(name, on_failure=None):
+    """Register a function as the handler for a job type."""
+    def decorator(func):
+        JOB_HANDLERS[name] = func
+        if on_failure is not None:
+            JOB_FAILURE_HANDLERS[name] = on_failure
+        return func
+    return decorator
+
+
+def _job_failed(job):
+    on_failure = JOB_FAILURE_HANDLERS.get(job.job_type)
+    if on_failure is not None:
+        try:
+            on_failure(job)
+        except Exception:
+            logger.exception('Failure handler for job %s failed', job)
+
+
+def enqueue(job_type, payload=None, user=None, max_attempts=None):
+    """Create a pending job and return it."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job type "{job_type}"')
+    return BackgroundJob.objects.create(
+        job_type=job_type,
+        payload=payload or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim_next(worker):
+    """Claim the oldest runnable job for a worker, or return None.
+
+    The claim is a conditional UPDATE, so two workers racing for the same
+    row cannot both win it.
+    """
+    now = timezone.now()
+    candidates = BackgroundJob.objects.filter(
+        status='pending', run_after__lte=now, job_type__in=list(JOB_HANDLERS)
+    ).order_by('run_after', 'pk').values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        claimed = BackgroundJob.objects.filter(pk=pk, status='pending').update(
+            status='running', worker=worker, heartbeat_at=now,
+            started_at=now, attempts=F('attempts') + 1, updated_at=now,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(pk=pk)
+    return None
+
+
+def heartbeat(pks, worker):
+    """Mark a worker's jobs as alive."""
+    if pks:
+        BackgroundJob.objects.filter(pk__in=pks, worker=worker, status='running').update(
+            heartbeat_at=timezone.now()
+        )
+
+
+def requeue_stale():
+    """Release running jobs whose worker stopped heartbeating."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    stale = BackgroundJob.objects.filter(status='running', heartbeat_at__lt=cutoff)
+    expired = list(stale.filter(attempts__gte=F('max_attempts')))
+    failed = stale.filter(pk__in=[job.pk for job in expired]).update(
+        status='failed', error_message='Worker stopped responding', completed_at=timezone.now()
+    )
+    for job in expired:
+        job.error_message = 'Worker stopped responding'
+        _job_failed(job)
+    requeued = stale.update(status='pending', worker='', run_after=timezone.now())
+    return requeued + failed
+
+
+def execute(job):
+    """Run a claimed job's handler and record the outcome."""
+    handler = JOB_HANDLERS[job.job_type]
+    try:
+        result = handler(job)
+    except Exception as e:
+        logger.exception('Job %s failed', job)
+        job.error_message = str(e)
+        if job.attempts < job.max_attempts:
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = 'failed'
+            job.completed_at = timezone.now()
+        job.worker = ''
+        job.save(update_fields=[
+            'status', 'error_message', 'run_after', 'worker', 'completed_at', 'updated_at'
+        ])
+        if job.status == 'failed':
+            _job_failed(job)
+        return False
+
+    job.status = 'completed'
+    job.result = result
+    job.progress = 100
+    job.error_message = ''
+    job.worker = ''
+    job.completed_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'result', 'progress', 'message', 'error_message', 'worker', 'completed_at', 'updated_at'
+    ])
+    return True
+
+
+@register_job('backup')
+def backup_job(job):
+    """Write a full or incremental streaming backup of the database."""
+    backup_name = job.payload.get('backup_name') or f"backup_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+
+    def progress(done, total, label):
+        job.report_progress(done * 100 // total if total else 100, label)
+
+    create = create_incremental if job.payload.get('incremental') else create_backup
+    manifest = create(
+        backup_name, include_media=job.payload.get('include_media', False), progress=progress
+    )
+    return {
+        'backup_name': backup_name,
+        'kind': manifest['kind'],
+        'parent': manifest['parent'],
+        'path': str(backup_path(backup_name)),
+        'rows': sum(entry['rows'] for entry in manifest['models']),
+        'bytes': sum(entry['bytes'] for entry in manifest['models']),
+    }
+
+
+@register_job('restore')
+def restore_job(job):
+    """Restore the database from a backup or a dumpdata file."""
+    def progress(done, total, label):
+        job.report_progress(done * 100 // total if total else 100, label)
+
+    if job.payload.get('backup_name'):
+        restored_from = job.payload['backup_name']
+        loaded = restore_backup(restored_from, progress=progress)
+    else:
+        restored_from = job.payload['backup_file']
+        loaded = restore_file(restored_from, progress=progress)
+    return {'restored_from': restored_from, 'rows': loaded}
+
+
+def rollover_failed(job):
+    """Mark a rollover's migration log failed once its job gives up."""
+    DataMigrationLog.objects.filter(pk=job.payload['migration_log']).update(
+        status='failed', error_message=job.error_message, completed_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+@register_job('rollover', on_failure=rollover_failed)
+def rollover_job(job):
+    """Copy a ranking year's brands into a new year."""
+    log = DataMigrationLog.objects.get(pk=job.payload['migration_log'])
+    copied = rollover_year(
+        log.from_year, log.to_year, log=log, year_fields=job.payload.get('year_fields')
+    )
+    return {'migration_log': log.pk, 'copied': copied}
+
+
+@register_job('rank_stability')
+def rank_stability_job(job):
+    """Run the Monte Carlo rank stability analysis for a year."""
+    rows = run_stability(
+        job.payload['year'], draws=job.payload.get('draws', 10000), sigma=job.payload.get('sigma')
+    )
+    return {'year': job.payload['year'], 'brands': len(rows)}
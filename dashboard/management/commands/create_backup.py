@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.backup import BackupError, backup_path, create_backup, create_incremental
+
+
+class Command(BaseCommand):
+    help = 'Write a streaming backup of the database to BACKUP_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help='Backup name (default: backup_<timestamp>)')
+        parser.add_argument('--media', action='store_true', help='Include files under MEDIA_ROOT')
+        parser.add_argument('--chunk-size', type=int, help='Rows read per query')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only back up changes since the parent backup'
+        )
+        parser.add_argument('--parent', help='Parent of an incremental backup (default: the latest backup)')
+
+    def handle(self, *args, **options):
+        name = options['name'] or f"backup_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            if options['incremental']:
+                manifest = create_incremental(
+                    name, parent=options['parent'], include_media=options['media'],
+                    chunk_size=options['chunk_size'],
+                )
+            else:
+                manifest = create_backup(name, include_media=options['media'], chunk_size=options['chunk_size'])
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        rows = sum(entry['rows'] for entry in manifest['models'])
+        size = sum(entry['bytes'] for entry in manifest['models'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Backed up {rows} rows from {len(manifest["models"])} models to {backup_path(name)} ({size} bytes)'
+        ))
+        if manifest['tombstones']:
+            self.stdout.write(f'Recorded {manifest["tombstones"]["rows"]} deletions since {manifest["parent"]}')
+        if manifest['media']:
+            self.stdout.write(f'Indexed {manifest["media"]["rows"]} media files')
@@ -0,0 +1,93 @@
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from core import counters
+from dashboard.jobs import claim_next, execute, heartbeat, requeue_stale
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of jobs to run at once')
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait between checks for new jobs'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no runnable jobs are left instead of waiting for more'
+        )
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        workers = max(1, options['workers'])
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write('Stopping after running jobs finish...')
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f'Worker {worker} started with {workers} threads')
+        running = {}
+        last_heartbeat = 0
+        last_flush = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                for pk, future in list(running.items()):
+                    if future.done():
+                        del running[pk]
+
+                if time.monotonic() - last_heartbeat >= settings.JOB_HEARTBEAT_INTERVAL:
+                    try:
+                        heartbeat(list(running), worker)
+                        requeue_stale()
+                        last_heartbeat = time.monotonic()
+                    except DatabaseError as e:
+                        # e.g. SQLite locked by a job's write transaction; retry next loop
+                        self.stderr.write(f'Heartbeat failed: {e}')
+
+                if time.monotonic() - last_flush >= settings.COUNTER_FLUSH_INTERVAL:
+                    try:
+                        counters.flush()
+                        last_flush = time.monotonic()
+                    except (DatabaseError, sqlite3.Error) as e:
+                        self.stderr.write(f'Counter flush failed: {e}')
+
+                claimed = False
+                while not stop.is_set() and len(running) < workers:
+                    job = claim_next(worker)
+                    if job is None:
+                        break
+                    claimed = True
+                    running[job.pk] = pool.submit(self.run_job, job)
+
+                if stop.is_set() or (options['once'] and not running and not claimed):
+                    break
+                stop.wait(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker} stopped'))
+
+    def run_job(self, job):
+        name = f'{job.job_type} #{job.pk}'
+        self.stdout.write(f'Running {name} (attempt {job.attempts}/{job.max_attempts})')
+        try:
+            if execute(job):
+                self.stdout.write(self.style.SUCCESS(f'Completed {name}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'{name} {job.status}: {job.error_message}'))
+        finally:
+            # Each pool thread has its own database connection
+            connection.close()
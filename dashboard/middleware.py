@@ -1,72 +1,50 @@
 """
 Custom middleware for dashboard authentication
 """
-from django.contrib.sessions.models import Session
-from django.contrib.auth.models import User
+from django.contrib.sessions.middleware import SessionMiddleware as BaseSessionMiddleware
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
 
+from .authentication import authenticate_request
+
+
+DASHBOARD_API_PREFIX = '/api/dashboard/'
+
+
+class SessionMiddleware(BaseSessionMiddleware):
+    """
+    Session middleware that leaves SESSION_SAVE_EVERY_REQUEST out of the dashboard API.
+    
+    Dashboard API requests are mostly token authenticated; saving every
+    session there would cost a session SELECT and UPDATE per request even
+    when the token was all that was used. Sessions changed by the request
+    (login, logout) are still saved.
+    """
+    
+    def process_response(self, request, response):
+        if request.path.startswith(DASHBOARD_API_PREFIX) and not request.session.modified:
+            if request.session.accessed:
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return super().process_response(request, response)
+
 
 class DashboardSessionMiddleware(MiddlewareMixin):
     """
-    Custom middleware to handle dashboard session authentication
+    Authenticate dashboard API requests carrying a dashboard token.
+    
+    The token comes from the Authorization header or the dashboard_session
+    cookie and is resolved without database queries once warm (see
+    dashboard.authentication). Requests without a valid token keep the
+    session user set by AuthenticationMiddleware.
     """
     
     def process_request(self, request):
-        """
-        Process incoming request to check for dashboard session
-        """
         # Only apply to dashboard API endpoints
-        if not request.path.startswith('/api/dashboard/'):
+        if not request.path.startswith(DASHBOARD_API_PREFIX):
             return None
         
-        print(f"🔧 Dashboard middleware processing: {request.path}")
-        print(f"🔧 Cookies received: {request.COOKIES}")
-        print(f"🔧 Headers: {dict(request.headers)}")
-
-        # Check for Authorization header first (more reliable for cross-origin)
-        auth_header = request.headers.get('Authorization', '')
-        session_key = None
-
-        if auth_header.startswith('Bearer '):
-            session_key = auth_header[7:]  # Remove 'Bearer ' prefix
-            print(f"🔧 Found session key in Authorization header: {session_key}")
-        else:
-            # Fallback to cookies
-            dashboard_session = request.COOKIES.get('dashboard_session')
-            sessionid = request.COOKIES.get('sessionid')
-            session_key = dashboard_session or sessionid
-            if session_key:
-                print(f"🔧 Found session key in cookies: {session_key}")
-        
-        if session_key:
-            print(f"🔧 Found session key: {session_key}")
-            
-            try:
-                # Try to get the session
-                session = Session.objects.get(session_key=session_key)
-                session_data = session.get_decoded()
-                
-                print(f"🔧 Session data: {session_data}")
-                
-                # If session has user_id, try to authenticate
-                user_id = session_data.get('user_id')
-                if user_id:
-                    try:
-                        user = User.objects.get(id=user_id)
-                        if user.is_staff:
-                            # Manually set the user on the request
-                            request.user = user
-                            print(f"🔧 Authenticated user: {user.username}")
-                        else:
-                            print(f"🔧 User {user.username} is not staff")
-                    except User.DoesNotExist:
-                        print(f"🔧 User {user_id} not found")
-                else:
-                    print(f"🔧 No user_id in session")
-                    
-            except Session.DoesNotExist:
-                print(f"🔧 Session {session_key} not found")
-        else:
-            print(f"🔧 No session key found in cookies")
-        
+        user = authenticate_request(request)
+        if user is not None:
+            request.user = user
         return None
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_background_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Model label, e.g. brands.brand', max_length=100)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_id', models.CharField(max_length=32, unique=True)),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='When the token would have expired anyway')),
+            ],
+        ),
+    ]
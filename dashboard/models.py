@@ -1,7 +1,26 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from core.models import TimeStampedModel
+from core.cache import bump_version_on_commit, versioned_local
+from core.queries import subquery_count
+
+
+class YearlyRankingQuerySet(models.QuerySet):
+    """QuerySet for YearlyRanking."""
+    
+    def with_counts(self):
+        """Annotate brand, blog post and insight counts per year."""
+        from brands.models import Brand
+        from blog.models import BlogPost
+        from insights.models import Insight
+        return self.annotate(
+            num_brands=subquery_count(Brand.objects.filter(year=models.OuterRef('year'))),
+            num_blog_posts=subquery_count(BlogPost.objects.filter(year=models.OuterRef('year'))),
+            num_insights=subquery_count(Insight.objects.filter(year=models.OuterRef('year'))),
+        )
 
 
 class YearlyRanking(TimeStampedModel):
@@ -31,6 +50,8 @@ class YearlyRanking(TimeStampedModel):
     research_lead = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='led_rankings')
     team_members = models.ManyToManyField(User, blank=True, related_name='ranking_teams')
     
+    objects = YearlyRankingQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-year']
         verbose_name = "Yearly Ranking"
@@ -42,28 +63,53 @@ class YearlyRanking(TimeStampedModel):
     def save(self, *args, **kwargs):
         # Ensure only one active year at a time
         if self.is_active:
-            YearlyRanking.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+            YearlyRanking.objects.filter(is_active=True).exclude(pk=self.pk).update(
+                is_active=False, updated_at=timezone.now()
+            )
         super().save(*args, **kwargs)
+        bump_version_on_commit('years')
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_version_on_commit('years')
+        return result
+    
+    @classmethod
+    def get_active_year(cls, default=2025):
+        """Get the active ranking year, cached until a YearlyRanking is saved."""
+        year = _active_year()
+        return year if year is not None else default
     
     @property
     def brands_count(self):
         """Get the actual number of brands for this year."""
+        if hasattr(self, 'num_brands'):
+            return self.num_brands
         from brands.models import Brand
         return Brand.objects.filter(year=self.year).count()
     
     @property
     def blog_posts_count(self):
         """Get the number of blog posts for this year."""
+        if hasattr(self, 'num_blog_posts'):
+            return self.num_blog_posts
         from blog.models import BlogPost
         return BlogPost.objects.filter(year=self.year).count()
     
     @property
     def insights_count(self):
         """Get the number of insights for this year."""
+        if hasattr(self, 'num_insights'):
+            return self.num_insights
         from insights.models import Insight
         return Insight.objects.filter(year=self.year).count()
 
 
+_active_year = versioned_local(
+    'years', lambda: YearlyRanking.objects.filter(is_active=True).values_list('year', flat=True).first()
+)
+
+
 class DashboardUser(TimeStampedModel):
     """Extended user profile for dashboard access."""
     
@@ -146,12 +192,33 @@ class DataMigrationLog(TimeStampedModel):
     def __str__(self):
         return f"{self.migration_type} - {self.from_year} to {self.to_year} ({self.status})"
     
+    @property
+    def progress_key(self):
+        return f'migration_progress:{self.pk}'
+    
+    def report_progress(self, items_processed):
+        """Publish progress of a running migration.
+        
+        A migration runs inside one transaction, so progress written to this
+        row is invisible to other connections until it commits; running
+        progress is published through the shared cache instead.
+        """
+        self.items_processed = items_processed
+        cache.set(self.progress_key, items_processed, 24 * 60 * 60)
+    
+    @property
+    def live_items_processed(self):
+        """Get items processed, including progress of a running migration."""
+        if self.status == 'running':
+            return cache.get(self.progress_key, self.items_processed)
+        return self.items_processed
+    
     @property
     def progress_percentage(self):
         """Calculate migration progress percentage."""
         if self.items_total == 0:
             return 0
-        return (self.items_processed / self.items_total) * 100
+        return (self.live_items_processed / self.items_total) * 100
 
 
 class SystemConfiguration(TimeStampedModel):
@@ -198,3 +265,92 @@ class SystemConfiguration(TimeStampedModel):
             config.description = description
             config.save()
         return config
+
+
+class BackgroundJob(TimeStampedModel):
+    """Long-running dashboard operation executed by the run_jobs worker."""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    job_type = models.CharField(max_length=50, help_text="Registered job handler name")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    # Scheduling and retries
+    run_after = models.DateTimeField(default=timezone.now, help_text="Do not start before this time")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    
+    # Worker tracking
+    worker = models.CharField(max_length=100, blank=True, help_text="Worker currently running the job")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    progress = models.PositiveIntegerField(default=0, help_text="Progress percentage")
+    message = models.CharField(max_length=255, blank=True)
+    
+    # Outcome
+    result = models.JSONField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='background_jobs'
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+    
+    def __str__(self):
+        return f"{self.job_type} #{self.pk} ({self.status})"
+    
+    @property
+    def progress_key(self):
+        return f'job_progress:{self.pk}'
+    
+    def report_progress(self, progress, message=''):
+        """Publish progress of a running job.
+        
+        Handlers often work inside a transaction, so progress goes through
+        the shared cache and is saved to this row when the job finishes.
+        """
+        self.progress = max(0, min(int(progress), 100))
+        self.message = message[:255]
+        cache.set(self.progress_key, (self.progress, self.message), 24 * 60 * 60)
+    
+    @property
+    def live_progress(self):
+        """Get (progress, message), including progress of a running job."""
+        if self.status == 'running':
+            return cache.get(self.progress_key, (self.progress, self.message))
+        return self.progress, self.message
+
+
+class Tombstone(models.Model):
+    """Record of a deleted row, replayed by incremental backups."""
+    
+    model = models.CharField(max_length=100, help_text="Model label, e.g. brands.brand")
+    object_pk = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['deleted_at']
+    
+    def __str__(self):
+        return f"{self.model} #{self.object_pk} deleted {self.deleted_at}"
+
+
+class RevokedToken(models.Model):
+    """Dashboard token revoked before it expired, e.g. by logging out."""
+    
+    token_id = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True, help_text="When the token would have expired anyway")
+    
+    def __str__(self):
+        return f"{self.token_id} (until {self.expires_at})"
@@ -0,0 +1,422 @@
+"""
+Restore from backups.
+
+Two formats are read: streaming backups (see dashboard.backup), restored by
+replaying their chain from the base snapshot, and plain dumpdata JSON files
+(optionally gzipped). Everything is checked before the database is touched:
+every file in the chain must match its manifest's row count and checksum and
+every media file must be in the store; a dumpdata file must parse and name
+known models.
+
+Rows are then bulk-inserted model by model in dependency order, inside one
+transaction with foreign key checks deferred and run once at the end, so a
+restore either completes or leaves the database as it was. Inserts are raw,
+like loaddata's saves: stored timestamps are kept and no signals are sent,
+so cached API responses are invalidated once afterwards instead.
+
+Replaced models are emptied through the ORM, children first, so deletes
+cascade as they would in the app; users are upserted instead (see
+UPSERTED_MODELS). Natural keys are resolved from lookups loaded once per
+referenced model rather than a query per row.
+
+In a replayed chain the base snapshot replaces every backed-up model; each
+incremental then deletes its tombstoned rows, replaces its snapshot models
+and upserts its changed rows. Incrementals cannot follow a restore, so the
+next backup must be full.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import zlib
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models.constants import OnConflict
+
+from api.signals import CACHE_NAMESPACES
+from brands.models import Brand
+from core.cache import bump_version_on_commit, year_namespace
+
+from .authentication import AUTH_NAMESPACE
+from .backup import (
+    BackupError, EXCLUDED_MODELS, MEDIA_INDEX_NAME, backup_chain, backup_path, backup_root,
+    media_store_path, read_rows, record_restore,
+)
+from .models import Tombstone
+
+
+# Models that rows restores leave alone (the job queue) refer to. Snapshots
+# upsert them and then delete the rows they lack, instead of deleting every
+# row first, so those references are not cascaded or nulled.
+UPSERTED_MODELS = {'auth.user'}
+
+PRUNE_BATCH_SIZE = 500
+
+def resolve_backup_file(path):
+    """Resolve a dumpdata file path, refusing anything outside BACKUP_ROOT."""
+    root = backup_root().resolve()
+    resolved = (root / path).resolve()
+    if not resolved.is_relative_to(root):
+        raise BackupError(f'"{path}" is outside the backup directory')
+    if not resolved.is_file():
+        raise BackupError(f'Backup file "{path}" does not exist')
+    return resolved
+
+
+def _m2m_fields(model):
+    return [
+        field for field in model._meta.many_to_many
+        if field.serialize and field.remote_field.through._meta.auto_created
+    ]
+
+
+def _tables(models):
+    tables = []
+    for model in models:
+        tables.append(model._meta.db_table)
+        tables.extend(field.remote_field.through._meta.db_table for field in _m2m_fields(model))
+    return tables
+
+
+def _clear(models):
+    """Delete the rows of models, children first, except upserted models'."""
+    for model in reversed(models):
+        if model._meta.label_lower not in UPSERTED_MODELS:
+            model._base_manager.all().delete()
+
+
+def _prune(model, keep):
+    """Delete the rows of an upserted model that a snapshot did not contain."""
+    stale = [pk for pk in model._base_manager.values_list('pk', flat=True).iterator() if pk not in keep]
+    for start in range(0, len(stale), PRUNE_BATCH_SIZE):
+        model._base_manager.filter(pk__in=stale[start:start + PRUNE_BATCH_SIZE]).delete()
+
+
+def _natural_key_fields(model):
+    """Get the relations of a model that backups store as natural keys."""
+    return [
+        field for field in model._meta.fields + model._meta.many_to_many
+        if field.remote_field is not None and field.serialize
+        and hasattr(field.remote_field.model, 'natural_key')
+        and hasattr(field.remote_field.model._default_manager, 'get_by_natural_key')
+    ]
+
+
+def _natural_keys(model, lookups):
+    """Get {natural key: instance} for a model, loaded once per restore."""
+    if model not in lookups:
+        lookups[model] = {
+            tuple(obj.natural_key()): obj for obj in model._base_manager.select_related()
+        }
+    return lookups[model]
+
+
+def _resolve_natural_keys(model, rows, lookups):
+    """Replace natural keys in rows with primary keys from preloaded lookups.
+
+    The deserializer would otherwise query once per reference. Keys missing
+    from the lookups are left for the deserializer to resolve or report.
+    """
+    fields = _natural_key_fields(model)
+    for row in rows:
+        values = row['fields']
+        for field in fields:
+            value = values.get(field.name)
+            if not value:
+                continue
+            keys = _natural_keys(field.remote_field.model, lookups)
+            if field.many_to_many:
+                values[field.name] = [_natural_key_value(keys, item, 'pk') for item in value]
+            else:
+                values[field.name] = _natural_key_value(keys, value, field.remote_field.field_name)
+        yield row
+
+
+def _natural_key_value(keys, value, attname):
+    if isinstance(value, (list, tuple)):
+        obj = keys.get(tuple(value))
+        if obj is not None:
+            return getattr(obj, attname)
+    return value
+
+
+def _insert(model, objects, upsert):
+    """Insert model instances exactly as stored.
+
+    This is the raw insert Model.save_base(raw=True) makes for loaddata;
+    bulk_create would overwrite auto_now and auto_now_add timestamps.
+    """
+    opts = model._meta
+    fields = opts.concrete_fields
+    options = {}
+    if upsert:
+        options = {
+            'on_conflict': OnConflict.UPDATE,
+            'unique_fields': [opts.pk],
+            'update_fields': [field for field in fields if not field.primary_key],
+        }
+    queryset = model._base_manager.using(DEFAULT_DB_ALIAS)
+    batch_size = max(connection.ops.bulk_batch_size(fields, objects), 1)
+    for start in range(0, len(objects), batch_size):
+        queryset._insert(objects[start:start + batch_size], fields=fields, raw=True, **options)
+
+
+def _insert_m2m(model, deserialized, upsert):
+    for field in _m2m_fields(model):
+        through = field.remote_field.through
+        source, target = f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id'
+        if upsert:
+            through._base_manager.filter(
+                **{f'{source}__in': [obj.object.pk for obj in deserialized]}
+            ).delete()
+        through._base_manager.bulk_create([
+            through(**{source: obj.object.pk, target: pk})
+            for obj in deserialized for pk in (obj.m2m_data or {}).get(field.name, [])
+        ])
+
+
+def _load(model, rows, upsert, chunk_size, lookups, on_chunk=None, loaded_pks=None):
+    """Deserialize rows of one model and bulk-insert them a chunk at a time.
+
+    lookups caches natural keys across the restore; loaded_pks, when given,
+    collects the primary keys inserted. Returns the objects whose forward
+    references still need saving.
+    """
+    deferred = []
+    chunk = []
+
+    def flush_chunk():
+        _insert(model, [obj.object for obj in chunk], upsert)
+        _insert_m2m(model, chunk, upsert)
+        if loaded_pks is not None:
+            loaded_pks.update(obj.object.pk for obj in chunk)
+        deferred.extend(obj for obj in chunk if obj.deferred_fields)
+        if on_chunk is not None:
+            on_chunk(len(chunk))
+        chunk.clear()
+
+    rows = _resolve_natural_keys(model, rows, lookups)
+    for obj in serializers.deserialize('python', rows, handle_forward_references=True):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            flush_chunk()
+    if chunk:
+        flush_chunk()
+    # Rows just loaded may be referenced by natural key from later models
+    lookups.pop(model, None)
+    return deferred
+
+
+def _check_file(name, entry):
+    digest = hashlib.sha256()
+    rows = 0
+    try:
+        with gzip.open(backup_path(name) / entry['file'], 'rb') as fh:
+            for line in fh:
+                digest.update(line)
+                rows += 1
+    except (OSError, EOFError, zlib.error) as e:
+        raise BackupError(f'Cannot read {name}/{entry["file"]}: {e}')
+    if rows != entry['rows'] or digest.hexdigest() != entry['sha256']:
+        raise BackupError(f'{name}/{entry["file"]} does not match its manifest')
+
+
+def validate_chain(chain):
+    """Check every file of a backup chain against its manifest."""
+    for manifest in chain:
+        for entry in manifest['models']:
+            try:
+                apps.get_model(entry['model'])
+            except LookupError:
+                raise BackupError(f'Backup "{manifest["name"]}" contains unknown model {entry["model"]}')
+            _check_file(manifest['name'], entry)
+        if manifest.get('tombstones'):
+            _check_file(manifest['name'], manifest['tombstones'])
+        if manifest.get('media'):
+            _check_file(manifest['name'], manifest['media'])
+            for row in read_rows(manifest['name'], MEDIA_INDEX_NAME):
+                stored = media_store_path(row['sha256'])
+                if not stored.is_file() or stored.stat().st_size != row['size']:
+                    raise BackupError(f'Media file {row["path"]} is missing from the store')
+
+
+def _restore_media(chain):
+    files = {}
+    for manifest in chain:
+        if manifest.get('media'):
+            for row in read_rows(manifest['name'], MEDIA_INDEX_NAME):
+                files[row['path']] = row['sha256']
+
+    media_root = Path(settings.MEDIA_ROOT)
+    for path, digest in files.items():
+        target = media_root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + '.partial')
+        shutil.copyfile(media_store_path(digest), partial)
+        os.replace(partial, target)
+    return len(files)
+
+
+def _finish(models, deferred, years):
+    """Resolve forward references, check constraints and reset sequences.
+
+    Runs last inside the restore's transaction; a constraint violation rolls
+    the whole restore back.
+    """
+    for obj in deferred:
+        obj.save_deferred_fields()
+    connection.check_constraints(table_names=_tables(models))
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    # Deletions made while restoring are not changes to back up
+    Tombstone.objects.all().delete()
+    years |= set(Brand.objects.values_list('year', flat=True).distinct())
+    namespaces = set(CACHE_NAMESPACES.values()) | {'years', AUTH_NAMESPACE}
+    namespaces |= {year_namespace('brands', year) for year in years}
+    bump_version_on_commit(*namespaces)
+
+
+def _progress_callback(progress, total):
+    done = 0
+
+    def on_chunk(rows, label):
+        nonlocal done
+        done += rows
+        progress(done, total, label)
+    return on_chunk if progress else None
+
+
+def restore_backup(name, media=True, chunk_size=None, progress=None):
+    """Restore the database (and optionally media) from a backup chain.
+
+    progress, when given, is called with (rows_done, rows_total, model_label).
+    Returns the number of rows loaded per model label.
+    """
+    chain = backup_chain(name)
+    validate_chain(chain)
+    chunk_size = chunk_size or settings.BACKUP_CHUNK_SIZE
+    on_chunk = _progress_callback(
+        progress, sum(entry['rows'] for manifest in chain for entry in manifest['models'])
+    )
+    loaded = {}
+    touched = set()
+    deferred = []
+    lookups = {}
+
+    with transaction.atomic():
+        years = set(Brand.objects.values_list('year', flat=True).distinct())
+        with connection.constraint_checks_disabled():
+            for manifest in chain:
+                if manifest.get('tombstones'):
+                    deleted = {}
+                    for row in read_rows(manifest['name'], manifest['tombstones']['file']):
+                        deleted.setdefault(row['model'], []).append(row['pk'])
+                    for label, pks in deleted.items():
+                        model = apps.get_model(label)
+                        model._base_manager.filter(pk__in=pks).delete()
+                        touched.add(model)
+
+                _clear([
+                    apps.get_model(entry['model']) for entry in manifest['models']
+                    if entry['mode'] == 'snapshot'
+                ])
+                pruned = []
+                for entry in manifest['models']:
+                    model = apps.get_model(entry['model'])
+                    replaced = entry['mode'] == 'snapshot'
+                    upserted = entry['model'] in UPSERTED_MODELS
+                    keep = set() if replaced and upserted else None
+                    deferred += _load(
+                        model, read_rows(manifest['name'], entry['file']), upserted or not replaced,
+                        chunk_size, lookups,
+                        on_chunk=(lambda rows, label=entry['model']: on_chunk(rows, label)) if on_chunk else None,
+                        loaded_pks=keep,
+                    )
+                    if keep is not None:
+                        pruned.append((model, keep))
+                    loaded[entry['model']] = loaded.get(entry['model'], 0) + entry['rows']
+                    touched.add(model)
+                for model, keep in reversed(pruned):
+                    _prune(model, keep)
+        _finish(list(touched), deferred, years)
+    record_restore(name)
+
+    if media:
+        loaded['media'] = _restore_media(chain)
+    return loaded
+
+
+def _read_dump(path):
+    """Parse a dumpdata JSON file and group its objects by model."""
+    opener = gzip.open if path.suffix == '.gz' else open
+    try:
+        with opener(path, 'rt', encoding='utf-8') as fh:
+            objects = json.load(fh)
+    except (OSError, EOFError, zlib.error, ValueError) as e:
+        raise BackupError(f'Cannot read {path.name}: {e}')
+    if not isinstance(objects, list):
+        raise BackupError(f'{path.name} is not a dumpdata file')
+
+    by_model = {}
+    for obj in objects:
+        if not isinstance(obj, dict) or 'model' not in obj or 'fields' not in obj:
+            raise BackupError(f'{path.name} is not a dumpdata file')
+        label = obj['model'].lower()
+        if label in EXCLUDED_MODELS:
+            continue
+        try:
+            apps.get_model(label)
+        except LookupError:
+            raise BackupError(f'{path.name} contains unknown model {obj["model"]}')
+        by_model.setdefault(label, []).append(obj)
+    return by_model
+
+
+def restore_file(path, chunk_size=None, progress=None):
+    """Replace the models in a dumpdata JSON file with its contents.
+
+    path is relative to BACKUP_ROOT. A dumpdata file is one JSON document, so
+    it is read whole; models that backups skip (content types, permissions,
+    sessions and the job queue) are not restored.
+    Returns the number of rows loaded per model label.
+    """
+    path = resolve_backup_file(path)
+    by_model = _read_dump(path)
+    models = serializers.sort_dependencies(
+        [(None, [apps.get_model(label) for label in by_model])], allow_cycles=True
+    )
+    chunk_size = chunk_size or settings.BACKUP_CHUNK_SIZE
+    on_chunk = _progress_callback(progress, sum(len(rows) for rows in by_model.values()))
+    deferred = []
+    lookups = {}
+
+    with transaction.atomic():
+        years = set(Brand.objects.values_list('year', flat=True).distinct())
+        with connection.constraint_checks_disabled():
+            _clear(models)
+            pruned = []
+            for model in models:
+                label = model._meta.label_lower
+                keep = set() if label in UPSERTED_MODELS else None
+                deferred += _load(
+                    model, by_model[label], keep is not None, chunk_size, lookups,
+                    on_chunk=(lambda rows, label=label: on_chunk(rows, label)) if on_chunk else None,
+                    loaded_pks=keep,
+                )
+                if keep is not None:
+                    pruned.append((model, keep))
+            for model, keep in reversed(pruned):
+                _prune(model, keep)
+        _finish(models, deferred, years)
+    record_restore(path.name)
+    return {label: len(rows) for label, rows in by_model.items()}
@@ -0,0 +1,112 @@
+"""
+Year rollover: clone a ranking year's brands into a new year.
+
+Brands are copied in pk-ordered chunks with bulk_create, each chunk followed
+by its metrics, achievements and timeline rows, all inside one transaction
+(which also creates the new YearlyRanking) so a failed rollover leaves
+nothing behind. Copied brands start with previous_rank set to the source
+year's current_rank and fresh engagement counters, and the source year's
+final ranks are snapshotted to BrandRanking.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from brands.models import Brand, BrandMetric, BrandAchievement, BrandTimeline, BrandRanking
+from core.cache import bump_version_on_commit, year_namespace
+
+from .models import YearlyRanking
+
+
+CHILD_MODELS = [BrandMetric, BrandAchievement, BrandTimeline]
+
+# Fields never copied: identity, timestamps and per-year engagement
+SKIPPED_FIELDS = {
+    'id', 'created_at', 'updated_at',
+    'views_count', 'likes_count', 'shares_count', 'trending_score',
+}
+
+
+def _copy_fields(model):
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if field.name not in SKIPPED_FIELDS
+    ]
+
+
+def rollover_year(source_year, target_year, log=None, chunk_size=500, year_fields=None):
+    """Copy every brand of source_year, with its child rows, into target_year.
+
+    When year_fields is given, the target YearlyRanking is created from it in
+    the same transaction. Brands whose slug already exists in target_year are
+    skipped. Progress is reported through log (a DataMigrationLog) when
+    given; a failure is recorded on it but leaves it running, for the caller
+    to retry or mark failed. Returns the number of rows created per model name.
+    """
+    existing = Brand.objects.filter(year=target_year).values_list('slug', flat=True)
+    brands = Brand.objects.filter(year=source_year).exclude(slug__in=list(existing)).order_by('pk')
+    brand_fields = _copy_fields(Brand)
+    child_fields = {model: _copy_fields(model) for model in CHILD_MODELS}
+
+    created = {model.__name__: 0 for model in [Brand] + CHILD_MODELS}
+    processed = 0
+    if log is not None:
+        log.items_total = brands.count() + sum(
+            model.objects.filter(brand__in=brands).count() for model in CHILD_MODELS
+        )
+        log.status = 'running'
+        log.started_at = timezone.now()
+        log.save(update_fields=['items_total', 'status', 'started_at', 'updated_at'])
+
+    try:
+        with transaction.atomic():
+            if year_fields is not None:
+                YearlyRanking.objects.create(year=target_year, **year_fields)
+            last_pk = 0
+            while True:
+                sources = list(brands.filter(pk__gt=last_pk)[:chunk_size])
+                if not sources:
+                    break
+                last_pk = sources[-1].pk
+
+                copies = []
+                for source in sources:
+                    copy = Brand(**{name: getattr(source, name) for name in brand_fields})
+                    copy.year = target_year
+                    copy.previous_rank = source.current_rank
+                    copy.is_new_entry = False
+                    copies.append(copy)
+                Brand.objects.bulk_create(copies, batch_size=chunk_size)
+                new_ids = {source.pk: copy.pk for source, copy in zip(sources, copies)}
+                created['Brand'] += len(copies)
+                processed += len(copies)
+
+                for model in CHILD_MODELS:
+                    rows = [
+                        model(**{
+                            **{name: getattr(child, name) for name in child_fields[model]},
+                            'brand_id': new_ids[child.brand_id],
+                        })
+                        for child in model.objects.filter(brand_id__in=new_ids).order_by('pk')
+                    ]
+                    model.objects.bulk_create(rows, batch_size=chunk_size)
+                    created[model.__name__] += len(rows)
+                    processed += len(rows)
+
+                BrandRanking.snapshot(sources, source_year, batch_size=chunk_size)
+                if log is not None:
+                    log.report_progress(processed)
+
+            bump_version_on_commit('brands', year_namespace('brands', target_year), 'years')
+    except Exception as e:
+        # The log stays running; the job marks it failed once it stops retrying
+        if log is not None:
+            log.error_message = str(e)
+            log.save(update_fields=['error_message', 'updated_at'])
+        raise
+
+    if log is not None:
+        log.items_processed = processed
+        log.status = 'completed'
+        log.completed_at = timezone.now()
+        log.save(update_fields=['items_processed', 'status', 'completed_at', 'updated_at'])
+    return created
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import YearlyRanking, DashboardUser, DataMigrationLog, SystemConfiguration
+from .models import YearlyRanking, DashboardUser, DataMigrationLog, SystemConfiguration, BackgroundJob
 
 
 class LoginSerializer(serializers.Serializer):
@@ -70,6 +70,7 @@ class YearlyRankingSerializer(serializers.ModelSerializer):
 class DataMigrationLogSerializer(serializers.ModelSerializer):
     """Serializer for DataMigrationLog model."""
     initiated_by_name = serializers.CharField(source='initiated_by.get_full_name', read_only=True)
+    items_processed = serializers.IntegerField(source='live_items_processed', read_only=True)
     progress_percentage = serializers.ReadOnlyField()
     duration = serializers.SerializerMethodField()
     
@@ -91,6 +92,29 @@ class DataMigrationLogSerializer(serializers.ModelSerializer):
         return None
 
 
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    """Serializer for BackgroundJob model."""
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True, default=None)
+    progress = serializers.SerializerMethodField()
+    message = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id', 'job_type', 'payload', 'status', 'progress', 'message',
+            'attempts', 'max_attempts', 'run_after', 'heartbeat_at',
+            'result', 'error_message', 'created_by', 'created_by_name',
+            'started_at', 'completed_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    def get_progress(self, obj):
+        return obj.live_progress[0]
+    
+    def get_message(self, obj):
+        return obj.live_progress[1]
+
+
 class SystemConfigurationSerializer(serializers.ModelSerializer):
     """Serializer for SystemConfiguration model."""
     
@@ -0,0 +1,38 @@
+"""
+Dashboard signal handlers.
+
+Every backed-up model that incremental backups select by updated_at gets a
+post_delete handler writing a Tombstone, since a deleted row leaves nothing
+behind for the watermark to find. User changes invalidate the users cached
+by dashboard token authentication.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+
+from core.cache import bump_version_on_commit
+
+from .authentication import AUTH_NAMESPACE
+from .backup import backup_models, incremental_field
+from .models import Tombstone
+
+
+def record_tombstone(sender, instance, **kwargs):
+    """Remember a deleted row for the next incremental backup."""
+    Tombstone.objects.create(model=sender._meta.label_lower, object_pk=str(instance.pk))
+
+
+def invalidate_user_cache(sender, instance, update_fields=None, **kwargs):
+    """Drop cached dashboard users after a user changes."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_version_on_commit(AUTH_NAMESPACE)
+
+
+def connect_signals():
+    for model in backup_models():
+        if incremental_field(model) == 'updated_at':
+            post_delete.connect(
+                record_tombstone, sender=model, dispatch_uid=f'backup_tombstone_{model._meta.label_lower}'
+            )
+    post_save.connect(invalidate_user_cache, sender=User, dispatch_uid='dashboard_auth_user_save')
+    post_delete.connect(invalidate_user_cache, sender=User, dispatch_uid='dashboard_auth_user_delete')
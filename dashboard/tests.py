@@ -1,3 +1,217 @@
-from django.test import TestCase
+import gzip
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from brands.models import Brand, BrandMetric
+from core.models import Category
+
+from . import authentication
+from .authentication import issue_token, resolve_token, revoke_token
+from .backup import WATERMARK_OVERLAP, BackupError, backup_path, create_backup, create_incremental
+from .models import BackgroundJob, RevokedToken, Tombstone
+from .restore import restore_backup
+
+
+class BackupRestoreTests(TestCase):
+    models = [User, Category, Brand, BrandMetric]
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(BACKUP_ROOT=self.root, MEDIA_ROOT=f'{self.root}/site-media')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = User.objects.create_user('editor', password='x', is_staff=True)
+        self.category = Category.objects.create(name='Banking', slug='banking')
+        self.brand = Brand.objects.create(
+            title='Acme', slug='acme', description='x', full_description='x', current_rank=1,
+            brand_value='₦1T', growth_rate='+1%', category=self.category,
+        )
+        self.metric = BrandMetric.objects.create(brand=self.brand, label='Customers', value='5M')
+        self.job = BackgroundJob.objects.create(job_type='backup', created_by=self.user)
+
+    def state(self):
+        return {
+            model._meta.label: serializers.serialize('json', model._base_manager.order_by('pk'))
+            for model in self.models
+        }
+
+    def test_full_round_trip(self):
+        create_backup('full')
+        expected = self.state()
+
+        Brand.objects.filter(pk=self.brand.pk).update(title='Changed')
+        self.metric.delete()
+        Category.objects.create(name='Telecoms', slug='telecoms')
+        User.objects.create_user('intruder')
+
+        loaded = restore_backup('full', media=False)
+        self.assertEqual(loaded['brands.brand'], 1)
+        self.assertEqual(self.state(), expected)
+        # Users are upserted, so rows outside the backup keep pointing at them
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.created_by, self.user)
+        self.assertFalse(Tombstone.objects.exists())
+
+    def age_rows(self):
+        """Move every row's updated_at to before the next backup's overlap window."""
+        long_ago = timezone.now() - 2 * WATERMARK_OVERLAP
+        for model in (Category, Brand, BrandMetric):
+            model.objects.update(updated_at=long_ago)
+
+    def changed_rows(self, manifest, label):
+        return next(entry['rows'] for entry in manifest['models'] if entry['model'] == label)
+
+    def test_incremental_chain_round_trip(self):
+        self.age_rows()
+        create_backup('full')
+        self.brand.title = 'Renamed'
+        self.brand.save()
+        self.metric.delete()
+        self.assertTrue(Tombstone.objects.filter(model='brands.brandmetric').exists())
+        Category.objects.create(name='Telecoms', slug='telecoms')
+        manifest = create_incremental('incr')
+        self.assertEqual(manifest['parent'], 'full')
+        expected = self.state()
+
+        Brand.objects.all().delete()
+        Category.objects.all().delete()
+
+        restore_backup('incr', media=False)
+        self.assertEqual(self.state(), expected)
+        self.assertEqual(Brand.objects.get().title, 'Renamed')
+        self.assertFalse(BrandMetric.objects.exists())
+        self.assertEqual(self.changed_rows(manifest, 'brands.brand'), 1)
+
+    def test_incremental_excludes_changes_older_than_the_overlap(self):
+        self.age_rows()
+        full = create_backup('full')
+        # A change stamped before the parent's watermark, which already reaches back WATERMARK_OVERLAP
+        Brand.objects.filter(pk=self.brand.pk).update(
+            title='Too old', updated_at=datetime.fromisoformat(full['watermark']) - timedelta(seconds=1),
+        )
+        manifest = create_incremental('incr')
+        self.assertEqual(self.changed_rows(manifest, 'brands.brand'), 0)
+        self.assertEqual(self.changed_rows(manifest, 'core.category'), 0)
+
+        restore_backup('incr', media=False)
+        self.assertEqual(Brand.objects.get().title, 'Acme')
+
+    def test_incremental_after_restore_is_refused(self):
+        create_backup('full')
+        restore_backup('full', media=False)
+        with self.assertRaises(BackupError):
+            create_incremental('incr')
+
+    def test_corrupt_backup_is_rejected(self):
+        create_backup('full')
+        path = backup_path('full') / 'brands.brand.ndjson.gz'
+        with gzip.open(path, 'rb') as fh:
+            data = fh.read()
+        with gzip.open(path, 'wb') as fh:
+            fh.write(data.replace(b'Acme', b'Acne'))
+        Brand.objects.filter(pk=self.brand.pk).update(title='Untouched')
+
+        with self.assertRaises(BackupError):
+            restore_backup('full', media=False)
+        self.assertEqual(Brand.objects.get().title, 'Untouched')
+
+    def test_reserved_and_invalid_names(self):
+        for name in ['media', 'full.partial', '../escape', '']:
+            with self.subTest(name=name), self.assertRaises(BackupError):
+                create_backup(name)
+
+
+class DashboardTokenTests(TestCase):
+    def setUp(self):
+        authentication._auth_state.clear()
+        self.user = User.objects.create_user('editor', password='x', is_staff=True)
+
+    def test_issued_token_resolves_to_its_user(self):
+        token = issue_token(self.user)
+        self.assertEqual(resolve_token(token), self.user)
+        self.assertNotEqual(issue_token(self.user), token)
+
+    def test_tampered_token_is_rejected(self):
+        token = issue_token(self.user)
+        self.assertIsNone(resolve_token(token[:-1] + ('A' if token[-1] != 'A' else 'B')))
+        self.assertIsNone(resolve_token('not-a-token'))
+
+    @override_settings(DASHBOARD_TOKEN_MAX_AGE=60)
+    def test_expired_token_is_rejected(self):
+        token = issue_token(self.user)
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 61):
+            self.assertIsNone(resolve_token(token))
+
+    def test_revoked_token_is_rejected(self):
+        token = issue_token(self.user)
+        other = issue_token(self.user)
+        self.assertIsNotNone(resolve_token(token))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(revoke_token(token))
+        self.assertIsNone(resolve_token(token))
+        self.assertEqual(resolve_token(other), self.user)
+
+    def test_revocation_survives_a_cleared_cache(self):
+        token = issue_token(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_token(token)
+        cache.clear()
+        authentication._auth_state.clear()
+        self.assertIsNone(resolve_token(token))
+
+    def test_unreadable_revocations_reject_the_token(self):
+        token = issue_token(self.user)
+        with mock.patch.object(RevokedToken.objects, 'filter', side_effect=DatabaseError):
+            self.assertIsNone(resolve_token(token))
+
+    def test_deactivated_user_is_rejected(self):
+        token = issue_token(self.user)
+        self.assertIsNotNone(resolve_token(token))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(resolve_token(token))
+
+    def test_warm_path_needs_no_queries(self):
+        token = issue_token(self.user)
+        resolve_token(token)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_token(token), self.user)
+
+    def test_bearer_token_authenticates_dashboard_views_only(self):
+        token = issue_token(self.user)
+        response = self.client.get('/api/dashboard/jobs/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_token(token)
+        response = self.client.get('/api/dashboard/jobs/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertIn(response.status_code, (401, 403))
+        # A stale token does not lock clients out of the public API
+        response = self.client.get('/api/brands/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_requests_leave_the_session_alone(self):
+        response = self.client.post(
+            '/api/dashboard/auth/login/', {'username': 'editor', 'password': 'x'},
+            content_type='application/json',
+        )
+        token = response.json()['token']
+        self.assertIn('sessionid', self.client.cookies)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/dashboard/jobs/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
@@ -7,6 +7,7 @@ router = DefaultRouter()
 router.register(r'years', views.YearlyRankingViewSet, basename='yearly-ranking')
 router.register(r'configurations', views.SystemConfigurationViewSet, basename='system-configuration')
 router.register(r'migrations', views.DataMigrationLogViewSet, basename='data-migration-log')
+router.register(r'jobs', views.BackgroundJobViewSet, basename='background-job')
 router.register(r'users', views.DashboardUserViewSet, basename='dashboard-user')
 router.register(r'brands', views.DashboardBrandViewSet, basename='dashboard-brand')
 router.register(r'blog', views.DashboardBlogViewSet, basename='dashboard-blog')
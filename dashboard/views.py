@@ -1,5 +1,5 @@
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import authenticate, login, logout
@@ -7,22 +7,36 @@ from django.contrib.auth.models import User
 from django.db.models import Count, Q
 from django.utils import timezone
 from django.core.cache import cache
-from django.core.management import call_command
 from django.http import JsonResponse
 from datetime import datetime, timedelta
 import json
 import os
 
-from .models import YearlyRanking, DashboardUser, DataMigrationLog, SystemConfiguration
+from .models import YearlyRanking, DashboardUser, DataMigrationLog, SystemConfiguration, BackgroundJob
 from .serializers import (
     YearlyRankingSerializer, DashboardUserSerializer, 
-    DataMigrationLogSerializer, SystemConfigurationSerializer,
+    DataMigrationLogSerializer, SystemConfigurationSerializer, BackgroundJobSerializer,
     LoginSerializer, DashboardStatsSerializer, UserListSerializer, UserCreateUpdateSerializer
 )
 from brands.models import Brand
 from blog.models import BlogPost
 from insights.models import Insight
 from api.serializers import BrandListSerializer, BlogPostListSerializer, InsightListSerializer
+from rankings.engine import RankingError, rank_year, what_if
+from .authentication import DASHBOARD_AUTHENTICATION_CLASSES
+from .backup import BackupError, backup_chain
+from .jobs import enqueue
+from .restore import resolve_backup_file
+
+
+def job_accepted(job, **extra):
+    """Respond to a request whose work was queued as a background job."""
+    return Response({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/dashboard/jobs/{job.id}/',
+        **extra,
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -90,6 +104,7 @@ def dashboard_login(request):
 
 
 @api_view(['POST'])
+@authentication_classes(DASHBOARD_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def dashboard_logout(request):
     """Logout endpoint for dashboard users."""
@@ -98,6 +113,7 @@ def dashboard_logout(request):
 
 
 @api_view(['GET'])
+@authentication_classes(DASHBOARD_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
     """Get dashboard statistics."""
@@ -110,8 +126,7 @@ def dashboard_stats(request):
         )
     
     # Get current year
-    current_year = YearlyRanking.objects.filter(is_active=True).first()
-    current_year_num = current_year.year if current_year else 2025
+    current_year_num = YearlyRanking.get_active_year()
     
     # Calculate stats
     stats = {
@@ -140,8 +155,11 @@ def dashboard_stats(request):
 
 class YearlyRankingViewSet(viewsets.ModelViewSet):
     """ViewSet for managing yearly rankings."""
-    queryset = YearlyRanking.objects.all()
+    queryset = YearlyRanking.objects.with_counts().select_related(
+        'research_lead'
+    ).prefetch_related('team_members')
     serializer_class = YearlyRankingSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAdminOrReadOnly]
     ordering = ['-year']
     
@@ -175,7 +193,7 @@ class YearlyRankingViewSet(viewsets.ModelViewSet):
         year_ranking = self.get_object()
         
         # Deactivate all other years
-        YearlyRanking.objects.filter(is_active=True).update(is_active=False)
+        YearlyRanking.objects.filter(is_active=True).update(is_active=False, updated_at=timezone.now())
         
         # Activate this year
         year_ranking.is_active = True
@@ -186,6 +204,69 @@ class YearlyRankingViewSet(viewsets.ModelViewSet):
             'active_year': year_ranking.year
         })
     
+    @action(detail=True, methods=['post'])
+    def rerank(self, request, pk=None):
+        """Recompute a year's ranks from the ranking weights."""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        year_ranking = self.get_object()
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        
+        try:
+            results = rank_year(year_ranking.year, weights=request.data.get('weights'), dry_run=dry_run)
+        except RankingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'year': year_ranking.year,
+            'dry_run': dry_run,
+            'results': results,
+        })
+    
+    @action(detail=True, methods=['post'])
+    def simulate_stability(self, request, pk=None):
+        """Queue a Monte Carlo rank stability analysis for a year."""
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Permission denied'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        year_ranking = self.get_object()
+        try:
+            draws = int(request.data.get('draws', 10000))
+            sigma = request.data.get('sigma')
+            sigma = float(sigma) if sigma is not None else None
+        except (TypeError, ValueError):
+            return Response({'error': 'draws and sigma must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= draws <= 100000:
+            return Response({'error': 'draws must be between 1 and 100000'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = enqueue('rank_stability', {'year': year_ranking.year, 'draws': draws, 'sigma': sigma}, user=request.user)
+        return job_accepted(job)
+    
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def what_if(self, request, pk=None):
+        """Re-rank a year under submitted weights without saving."""
+        # Only the year number is needed, so skip the counts and prefetches
+        year = self.get_queryset().filter(pk=pk).values_list('year', flat=True).first()
+        if year is None:
+            return Response({'error': 'Year not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            results = what_if(year, request.data.get('weights'))
+        except RankingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'year': year,
+            'results': results,
+        })
+    
     @action(detail=True, methods=['post'])
     def duplicate_year(self, request, pk=None):
         """Duplicate a year's structure for a new year."""
@@ -212,50 +293,56 @@ class YearlyRankingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if year already exists
-        if YearlyRanking.objects.filter(year=new_year).exists():
+        # Check if year already exists or is being created
+        copying = DataMigrationLog.objects.filter(
+            migration_type='brand_copy', to_year=new_year, status__in=['pending', 'running']
+        )
+        if YearlyRanking.objects.filter(year=new_year).exists() or copying.exists():
             return Response(
                 {'error': f'Year {new_year} already exists'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create new year
-        new_year_ranking = YearlyRanking.objects.create(
-            year=new_year,
-            title=f"Top 50 Most Valuable Brands in Nigeria {new_year}",
-            description=f"The {new_year} edition of Nigeria's most comprehensive brand ranking.",
-            is_active=False,
-            is_published=False,
-            is_complete=False,
-            total_brands=source_year.total_brands,
-            research_methodology=source_year.research_methodology,
-            research_lead=request.user,
-        )
+        # The rollover job creates the year in the same transaction as its
+        # brands, so a failed copy leaves no empty year behind
+        year_fields = {
+            'title': f"Top 50 Most Valuable Brands in Nigeria {new_year}",
+            'description': f"The {new_year} edition of Nigeria's most comprehensive brand ranking.",
+            'is_active': False,
+            'is_published': False,
+            'is_complete': False,
+            'total_brands': source_year.total_brands,
+            'research_methodology': source_year.research_methodology,
+            'research_lead_id': request.user.pk,
+        }
+        new_year_ranking = YearlyRanking(year=new_year, **year_fields)
         
-        # Log the migration
-        DataMigrationLog.objects.create(
-            migration_type='new_year_setup',
+        # Copy the source year's brands and their child rows in the background
+        migration_log = DataMigrationLog.objects.create(
+            migration_type='brand_copy',
             from_year=source_year.year,
             to_year=new_year,
             description=f'Created new year {new_year} based on {source_year.year}',
             initiated_by=request.user,
-            status='completed',
-            items_total=1,
-            items_processed=1,
-            started_at=timezone.now(),
-            completed_at=timezone.now(),
+            status='pending',
+        )
+        job = enqueue(
+            'rollover', {'migration_log': migration_log.id, 'year_fields': year_fields}, user=request.user
         )
         
-        return Response({
-            'message': f'Year {new_year} created successfully',
-            'year_data': YearlyRankingSerializer(new_year_ranking).data
-        })
+        return job_accepted(
+            job,
+            message=f'Creating year {new_year} and copying brands',
+            year_data=YearlyRankingSerializer(new_year_ranking).data,
+            migration=DataMigrationLogSerializer(migration_log).data,
+        )
 
 
 class SystemConfigurationViewSet(viewsets.ModelViewSet):
     """ViewSet for managing system configurations."""
     queryset = SystemConfiguration.objects.all()
     serializer_class = SystemConfigurationSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
@@ -285,6 +372,7 @@ class DataMigrationLogViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing data migration logs."""
     queryset = DataMigrationLog.objects.all()
     serializer_class = DataMigrationLogSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
     ordering = ['-created_at']
     
@@ -297,9 +385,27 @@ class DataMigrationLogViewSet(viewsets.ReadOnlyModelViewSet):
         return self.queryset.filter(initiated_by=self.request.user)
 
 
+class BackgroundJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for polling background jobs."""
+    queryset = BackgroundJob.objects.select_related('created_by')
+    serializer_class = BackgroundJobSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated]
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        """Filter jobs based on user permissions."""
+        if self.request.user.is_staff:
+            return self.queryset
+        
+        # Regular users can only see their own jobs
+        return self.queryset.filter(created_by=self.request.user)
+
+
 class DashboardUserViewSet(viewsets.ModelViewSet):
     """ViewSet for managing dashboard users."""
     queryset = User.objects.all().order_by('-date_joined')
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAdminUser]
     
     def get_serializer_class(self):
@@ -392,6 +498,7 @@ class DashboardBrandViewSet(viewsets.ModelViewSet):
     """ViewSet for managing brands through dashboard."""
     queryset = Brand.objects.all()
     serializer_class = BrandListSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
@@ -414,11 +521,7 @@ class DashboardBrandViewSet(viewsets.ModelViewSet):
         """Set the creator when creating a brand."""
         # Default to current year if not specified
         if 'year' not in serializer.validated_data:
-            current_year = YearlyRanking.objects.filter(is_active=True).first()
-            if current_year:
-                serializer.save(year=current_year.year)
-            else:
-                serializer.save(year=2025)
+            serializer.save(year=YearlyRanking.get_active_year())
         else:
             serializer.save()
 
@@ -427,6 +530,7 @@ class DashboardBlogViewSet(viewsets.ModelViewSet):
     """ViewSet for managing blog posts through dashboard."""
     queryset = BlogPost.objects.all()
     serializer_class = BlogPostListSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
     ordering = ['-created_at']
     
@@ -453,6 +557,7 @@ class DashboardInsightViewSet(viewsets.ModelViewSet):
     """ViewSet for managing insights through dashboard."""
     queryset = Insight.objects.all()
     serializer_class = InsightListSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
     ordering = ['-created_at']
     
@@ -482,61 +587,57 @@ class DashboardBlogTagViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for listing all blog tags for dashboard use."""
     queryset = BlogTag.objects.all()
     serializer_class = BlogTagSerializer
+    authentication_classes = DASHBOARD_AUTHENTICATION_CLASSES
     permission_classes = [IsAuthenticated]
 
 
 # System Management Views
 @api_view(['POST'])
+@authentication_classes(DASHBOARD_AUTHENTICATION_CLASSES)
 @permission_classes([IsAdminUser])
 def system_backup_view(request):
-    """Create a system backup."""
-    try:
-        backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        # Create database backup using Django's dumpdata command
-        call_command('dumpdata', '--output', f'/tmp/{backup_name}.json', '--indent', '2')
-        
-        return Response({
-            'message': 'Backup created successfully',
-            'backup_name': backup_name,
-            'created_at': datetime.now().isoformat()
-        })
-    except Exception as e:
-        return Response(
-            {'error': f'Backup failed: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    """Queue a system backup."""
+    backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    include_media = str(request.data.get('include_media', '')).lower() in ('1', 'true', 'yes')
+    incremental = str(request.data.get('incremental', '')).lower() in ('1', 'true', 'yes')
+    job = enqueue('backup', {
+        'backup_name': backup_name, 'include_media': include_media, 'incremental': incremental,
+    }, user=request.user)
+    return job_accepted(job, backup_name=backup_name)
 
 
 @api_view(['POST'])
+@authentication_classes(DASHBOARD_AUTHENTICATION_CLASSES)
 @permission_classes([IsAdminUser])
 def system_restore_view(request):
-    """Restore system from backup."""
+    """Queue a restore from a backup, or from a dumpdata file."""
+    backup_name = request.data.get('backup_name')
     backup_file = request.data.get('backup_file')
     
+    if backup_name:
+        try:
+            backup_chain(backup_name)
+        except BackupError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        job = enqueue('restore', {'backup_name': backup_name}, user=request.user, max_attempts=1)
+        return job_accepted(job, backup_name=backup_name)
+    
     if not backup_file:
         return Response(
-            {'error': 'backup_file is required'}, 
+            {'error': 'backup_name or backup_file is required'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
     try:
-        # Restore from backup using Django's loaddata command
-        call_command('loaddata', backup_file)
-        
-        return Response({
-            'message': 'System restored successfully',
-            'restored_from': backup_file,
-            'restored_at': datetime.now().isoformat()
-        })
-    except Exception as e:
-        return Response(
-            {'error': f'Restore failed: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+        resolve_backup_file(backup_file)
+    except BackupError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    job = enqueue('restore', {'backup_file': backup_file}, user=request.user, max_attempts=1)
+    return job_accepted(job, backup_file=backup_file)
 
 
 @api_view(['GET'])
+@authentication_classes(DASHBOARD_AUTHENTICATION_CLASSES)
 @permission_classes([IsAuthenticated])
 def system_health_view(request):
     """Get system health status."""
@@ -592,6 +693,7 @@ def system_health_view(request):
 
 
 @api_view(['POST'])
+@authentication_classes(DASHBOARD_AUTHENTICATION_CLASSES)
 @permission_classes([IsAdminUser])
 def clear_cache_view(request):
     """Clear system cache."""
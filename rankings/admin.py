@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import RankStability
 
-# Register your models here.
+
+@admin.register(RankStability)
+class RankStabilityAdmin(admin.ModelAdmin):
+    list_display = ['brand', 'year', 'median_rank', 'rank_low', 'rank_high', 'prob_top_10', 'computed_at']
+    list_filter = ['year']
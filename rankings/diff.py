@@ -0,0 +1,143 @@
+"""
+Year-over-year ranking diff.
+
+Brands are matched across years by slug. Both years' rows are read in one
+query and compared in one pass; the result is cached under the two years'
+brand version stamps, so edits to other years do not invalidate it.
+"""
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from brands.models import Brand
+from core.cache import version_tag, year_namespace
+
+
+def _delta(new, old):
+    if new is None or old is None:
+        return None
+    return float(new - old)
+
+
+def _percent_change(new, old):
+    if new is None or not old:
+        return None
+    return round(float((new - old) / old * 100), 2)
+
+
+def _brand(row):
+    return {
+        'slug': row['slug'],
+        'title': row['title'],
+        'rank': row['current_rank'],
+        'category': row['category__name'],
+        'brand_value': float(row['brand_value_amount']) if row['brand_value_amount'] is not None else None,
+    }
+
+
+def compute_year_diff(from_year, to_year):
+    """Compare the published rankings of two years."""
+    rows = Brand.objects.filter(
+        year__in=[from_year, to_year], is_published=True, current_rank__isnull=False
+    ).values(
+        'year', 'slug', 'title', 'current_rank', 'category__name',
+        'brand_value_amount', 'growth_rate_percent'
+    )
+    by_year = {from_year: {}, to_year: {}}
+    for row in rows:
+        by_year[row['year']][row['slug']] = row
+    old, new = by_year[from_year], by_year[to_year]
+
+    entries, exits, movers = [], [], []
+    unchanged = 0
+    categories = defaultdict(lambda: {
+        'from_count': 0, 'to_count': 0, 'entries': 0, 'exits': 0,
+        'from_rank_total': 0, 'to_rank_total': 0,
+        'from_value': 0.0, 'to_value': 0.0,
+    })
+
+    for slug in old.keys() | new.keys():
+        before, after = old.get(slug), new.get(slug)
+        if before is not None:
+            category = categories[before['category__name'] or 'Uncategorized']
+            category['from_count'] += 1
+            category['from_rank_total'] += before['current_rank']
+            category['from_value'] += float(before['brand_value_amount'] or 0)
+        if after is not None:
+            category = categories[after['category__name'] or 'Uncategorized']
+            category['to_count'] += 1
+            category['to_rank_total'] += after['current_rank']
+            category['to_value'] += float(after['brand_value_amount'] or 0)
+
+        if before is None:
+            entries.append(_brand(after))
+            categories[after['category__name'] or 'Uncategorized']['entries'] += 1
+        elif after is None:
+            exits.append(_brand(before))
+            categories[before['category__name'] or 'Uncategorized']['exits'] += 1
+        else:
+            rank_change = before['current_rank'] - after['current_rank']
+            if not rank_change:
+                unchanged += 1
+            movers.append({
+                'slug': slug,
+                'title': after['title'],
+                'from_rank': before['current_rank'],
+                'to_rank': after['current_rank'],
+                'rank_change': rank_change,
+                'brand_value_delta': _delta(after['brand_value_amount'], before['brand_value_amount']),
+                'brand_value_change_percent': _percent_change(
+                    after['brand_value_amount'], before['brand_value_amount']
+                ),
+                'growth_rate_delta': _delta(after['growth_rate_percent'], before['growth_rate_percent']),
+                'category_changed': before['category__name'] != after['category__name'],
+            })
+
+    movers.sort(key=lambda row: (-abs(row['rank_change']), row['to_rank']))
+    entries.sort(key=lambda row: row['rank'])
+    exits.sort(key=lambda row: row['rank'])
+
+    category_changes = []
+    for name, category in sorted(categories.items()):
+        category_changes.append({
+            'category': name,
+            'from_count': category['from_count'],
+            'to_count': category['to_count'],
+            'entries': category['entries'],
+            'exits': category['exits'],
+            'from_average_rank': (
+                round(category['from_rank_total'] / category['from_count'], 2) if category['from_count'] else None
+            ),
+            'to_average_rank': (
+                round(category['to_rank_total'] / category['to_count'], 2) if category['to_count'] else None
+            ),
+            'brand_value_delta': category['to_value'] - category['from_value'],
+        })
+
+    return {
+        'from_year': from_year,
+        'to_year': to_year,
+        'summary': {
+            'from_brands': len(old),
+            'to_brands': len(new),
+            'entries': len(entries),
+            'exits': len(exits),
+            'moved': len(movers) - unchanged,
+            'unchanged': unchanged,
+        },
+        'entries': entries,
+        'exits': exits,
+        'movers': movers,
+        'categories': category_changes,
+    }
+
+
+def get_year_diff(from_year, to_year):
+    """Get the diff between two years, from cache when neither year changed."""
+    tag = version_tag(year_namespace('brands', from_year), year_namespace('brands', to_year), 'taxonomy')
+    key = f'year_diff:{from_year}:{to_year}:{tag}'
+    diff = cache.get(key)
+    if diff is None:
+        diff = compute_year_diff(from_year, to_year)
+        cache.set(key, diff, None)
+    return diff
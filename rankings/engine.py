@@ -0,0 +1,283 @@
+"""
+Composite ranking engine.
+
+A year's brands are loaded into an n x k matrix of raw inputs (parsed
+financials, recognition, rating and optionally BrandMetric values), each
+column is normalized to 0..1, and the composite score is the matrix times
+a weight vector. Weights live in SystemConfiguration under
+RANKING_WEIGHTS_KEY as JSON, e.g. {"brand_value": 0.5, "metric:Subscribers": 0.1}.
+"""
+import json
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from brands.models import Brand, BrandMetric, BrandRanking
+from core.cache import bump_version_on_commit, versioned_local, year_namespace
+from core.utils import parse_metric
+from dashboard.models import SystemConfiguration
+
+
+RANKING_WEIGHTS_KEY = 'ranking_weights'
+
+METRIC_PREFIX = 'metric:'
+
+# Length of the published ranking; Brand.current_rank is validated to 1..MAX_RANK
+MAX_RANK = 50
+
+# Tie-break rank of published brands outside the ranking, so they sort last
+UNRANKED = np.iinfo(np.int64).max
+
+# Input name -> (Brand field, log-scale before normalizing)
+BRAND_INPUTS = {
+    'brand_value': ('brand_value_amount', True),
+    'market_cap': ('market_cap_amount', True),
+    'revenue': ('revenue_amount', True),
+    'growth_rate': ('growth_rate_percent', False),
+    'brand_recognition': ('brand_recognition', False),
+    'customer_rating': ('customer_rating', False),
+}
+
+DEFAULT_WEIGHTS = {
+    'brand_value': 0.4,
+    'revenue': 0.2,
+    'market_cap': 0.1,
+    'growth_rate': 0.1,
+    'brand_recognition': 0.1,
+    'customer_rating': 0.1,
+}
+
+# Process-wide cache of RankingInputs for what-if scoring, by (year, input
+# names), emptied when the brands version stamp changes
+_ranking_inputs = versioned_local('brands', lambda year, names: RankingInputs(year, names))
+
+
+class RankingError(ValueError):
+    """Raised for unusable weights or years without brands."""
+
+
+def get_weights():
+    """Get the configured ranking weights, falling back to DEFAULT_WEIGHTS."""
+    raw = SystemConfiguration.get_value(RANKING_WEIGHTS_KEY)
+    if not raw:
+        return dict(DEFAULT_WEIGHTS)
+    try:
+        return clean_weights(json.loads(raw))
+    except (ValueError, TypeError) as e:
+        raise RankingError(f'Invalid {RANKING_WEIGHTS_KEY} configuration: {e}')
+
+
+def clean_weights(weights):
+    """Validate a {input name: weight} mapping and drop zero weights."""
+    if not isinstance(weights, dict) or not weights:
+        raise RankingError('Weights must be a non-empty object')
+    cleaned = {}
+    for name, weight in weights.items():
+        if name not in BRAND_INPUTS and not name.startswith(METRIC_PREFIX):
+            raise RankingError(f'Unknown ranking input "{name}"')
+        try:
+            weight = float(weight)
+        except (TypeError, ValueError):
+            raise RankingError(f'Weight for "{name}" must be a number')
+        if weight < 0 or not np.isfinite(weight):
+            raise RankingError(f'Weight for "{name}" must be a non-negative number')
+        if weight:
+            cleaned[name] = weight
+    if not cleaned:
+        raise RankingError('At least one weight must be positive')
+    return cleaned
+
+
+def normalize_columns(raw, log_scale):
+    """Scale each column of raw to 0..1; missing (NaN) values score 0.
+
+    Columns flagged in log_scale are log10-transformed first so that one very
+    large brand does not flatten the others.
+    """
+    values = raw.copy()
+    if log_scale.any():
+        logged = values[:, log_scale]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            logged = np.where(logged > 0, np.log10(logged), np.nan)
+        values[:, log_scale] = logged
+    present = ~np.isnan(values)
+    low = np.where(present, values, np.inf).min(axis=0)
+    high = np.where(present, values, -np.inf).max(axis=0)
+    span = high - low
+    # Constant or empty columns carry no ranking signal and normalize to 0
+    span[~np.isfinite(span) | (span == 0)] = 1
+    low[~np.isfinite(low)] = 0
+    normalized = (values - low) / span
+    return np.nan_to_num(normalized, nan=0.0)
+
+
+def rank_order(scores, tiebreak):
+    """Get 1-based ranks for scores (higher is better), breaking ties by tiebreak ascending."""
+    order = np.lexsort((tiebreak, -scores))
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+class RankingInputs:
+    """Raw and normalized ranking inputs for one year's published brands."""
+    
+    def __init__(self, year, input_names):
+        self.year = year
+        self.input_names = list(input_names)
+        rows = list(
+            Brand.objects.filter(year=year, is_published=True).order_by(
+                F('current_rank').asc(nulls_last=True), 'pk'
+            ).values_list(
+                'pk', 'slug', 'title', 'current_rank',
+                *[BRAND_INPUTS[name][0] for name in self.brand_input_names]
+            )
+        )
+        if not rows:
+            raise RankingError(f'No published brands for {year}')
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.slugs = [row[1] for row in rows]
+        self.titles = [row[2] for row in rows]
+        self.published_ranks = [row[3] for row in rows]
+        self.current_ranks = np.array(
+            [UNRANKED if rank is None else rank for rank in self.published_ranks], dtype=np.int64
+        )
+        
+        raw = np.full((len(rows), len(self.input_names)), np.nan)
+        brand_columns = [self.input_names.index(name) for name in self.brand_input_names]
+        for i, row in enumerate(rows):
+            for column, value in zip(brand_columns, row[4:]):
+                if value is not None:
+                    raw[i, column] = float(value)
+        if self.metric_labels:
+            position = {pk: i for i, pk in enumerate(self.ids.tolist())}
+            metrics = BrandMetric.objects.filter(
+                brand_id__in=position, label__in=self.metric_labels
+            ).values_list('brand_id', 'label', 'value')
+            for brand_id, label, value in metrics:
+                number = parse_metric(value)
+                if number is not None:
+                    raw[position[brand_id], self.input_names.index(METRIC_PREFIX + label)] = float(number)
+        self.raw = raw
+        log_scale = np.array([
+            BRAND_INPUTS[name][1] if name in BRAND_INPUTS else False for name in self.input_names
+        ])
+        self.normalized = normalize_columns(raw, log_scale)
+    
+    @property
+    def brand_input_names(self):
+        return [name for name in self.input_names if name in BRAND_INPUTS]
+    
+    @property
+    def metric_labels(self):
+        return [name[len(METRIC_PREFIX):] for name in self.input_names if name.startswith(METRIC_PREFIX)]
+    
+    def weight_vector(self, weights):
+        """Get weights as a vector over input_names, summing to 1."""
+        vector = np.array([weights.get(name, 0.0) for name in self.input_names], dtype=float)
+        return vector / vector.sum()
+    
+    def score(self, weights):
+        """Get the composite score of every brand."""
+        return self.normalized @ self.weight_vector(weights)
+    
+    def rank(self, weights):
+        """Get (scores, ranks); ties keep the current order."""
+        scores = self.score(weights)
+        return scores, rank_order(scores, self.current_ranks)
+
+
+def get_ranking_inputs(year, weights):
+    """Get cached RankingInputs covering every brand input and the weighted metrics.
+
+    The matrix is reloaded only after brand data changes, so scoring a new
+    weight vector costs one matrix-vector product.
+    """
+    names = tuple(BRAND_INPUTS) + tuple(sorted(name for name in weights if name.startswith(METRIC_PREFIX)))
+    return _ranking_inputs(year, names)
+
+
+def what_if(year, weights):
+    """Re-rank a year's brands under other weights without saving anything.
+
+    Rows are ordered by the new rank; rank_change is positive for brands
+    that would move up from their published rank.
+    """
+    weights = clean_weights(weights)
+    inputs = get_ranking_inputs(year, weights)
+    scores, ranks = inputs.rank(weights)
+    order = np.argsort(ranks)
+    return [
+        {
+            'slug': inputs.slugs[i],
+            'title': inputs.titles[i],
+            'score': round(float(scores[i]), 6),
+            'rank': int(ranks[i]),
+            'published_rank': inputs.published_ranks[i],
+            'rank_change': (
+                inputs.published_ranks[i] - int(ranks[i]) if inputs.published_ranks[i] is not None else None
+            ),
+        }
+        for i in order
+    ]
+
+
+def previous_year_ranks(year, slugs):
+    """Get {slug: rank} for last year's ranked brands."""
+    return dict(
+        Brand.objects.filter(
+            year=year - 1, is_published=True, current_rank__isnull=False, slug__in=slugs
+        ).values_list('slug', 'current_rank')
+    )
+
+
+def rank_year(year, weights=None, dry_run=False):
+    """Score and rank a year's brands and save the result.
+
+    Writes current_rank/previous_rank with one bulk update and upserts the
+    year's BrandRanking snapshot, all in one transaction. Only the top
+    MAX_RANK brands get a rank; the rest stay published with an empty
+    current_rank, so they can re-enter on a later run, and are dropped from
+    the snapshot. Returns the ranked rows as dicts, best first, with a rank
+    of None below the cutoff.
+    """
+    weights = clean_weights(weights) if weights is not None else get_weights()
+    inputs = RankingInputs(year, weights)
+    scores, ranks = inputs.rank(weights)
+    previous = previous_year_ranks(year, inputs.slugs)
+
+    results = sorted((
+        {
+            'id': int(pk), 'slug': slug, 'score': round(float(score), 6), 'rank': int(rank),
+            'previous_rank': previous.get(slug), 'old_rank': old_rank,
+        }
+        for pk, slug, score, rank, old_rank in zip(
+            inputs.ids, inputs.slugs, scores, ranks, inputs.published_ranks
+        )
+    ), key=lambda row: row['rank'])
+    for row in results[MAX_RANK:]:
+        row['rank'] = None
+    if dry_run:
+        return results
+
+    by_id = {row['id']: row for row in results}
+    with transaction.atomic():
+        brands = list(Brand.objects.filter(pk__in=by_id).only(
+            'pk', 'current_rank', 'previous_rank', 'brand_value', 'growth_rate'
+        ))
+        now = timezone.now()
+        for brand in brands:
+            row = by_id[brand.pk]
+            brand.current_rank = row['rank']
+            if row['previous_rank'] is not None:
+                brand.previous_rank = row['previous_rank']
+            brand.updated_at = now
+        Brand.objects.bulk_update(brands, ['current_rank', 'previous_rank', 'updated_at'], batch_size=500)
+        BrandRanking.snapshot(brands, year)
+        BrandRanking.objects.filter(
+            year=year, brand_id__in=[row['id'] for row in results if row['rank'] is None]
+        ).delete()
+        bump_version_on_commit('brands', year_namespace('brands', year))
+    return results
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rankings.engine import MAX_RANK, RankingError, rank_year
+
+
+class Command(BaseCommand):
+    help = "Compute composite scores and ranks for a year's brands"
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, help='Ranking year')
+        parser.add_argument(
+            '--weights',
+            help='JSON weights to use instead of the ranking_weights configuration'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Print the new ranking without saving it'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            weights = json.loads(options['weights']) if options['weights'] else None
+            results = rank_year(options['year'], weights=weights, dry_run=options['dry_run'])
+        except (RankingError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for row in results:
+            if row['rank'] is None:
+                self.stdout.write(f"   -  {row['score']:.4f}   out  {row['slug']}")
+                continue
+            if row['old_rank'] is None:
+                change = 'new'
+            else:
+                moved = row['old_rank'] - row['rank']
+                change = f'{moved:+d}' if moved else '='
+            self.stdout.write(f"{row['rank']:>4}  {row['score']:.4f}  {change:>4}  {row['slug']}")
+
+        if options['dry_run']:
+            self.stdout.write('Dry run; nothing saved.')
+        else:
+            ranked = sum(row['rank'] is not None for row in results)
+            message = f"Ranked {ranked} brands for {options['year']}"
+            if ranked < len(results):
+                message += f'; {len(results) - ranked} below rank {MAX_RANK} left unranked'
+            self.stdout.write(self.style.SUCCESS(message))
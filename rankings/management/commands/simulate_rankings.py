@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rankings.engine import RankingError
+from rankings.simulation import run_stability
+
+
+class Command(BaseCommand):
+    help = "Estimate how stable a year's ranks are under measurement noise"
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, help='Ranking year')
+        parser.add_argument('--draws', type=int, default=10000, help='Number of simulated rankings')
+        parser.add_argument(
+            '--sigma', type=float,
+            help='Noise level for every input, overriding the stability_noise configuration'
+        )
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible results')
+
+    def handle(self, *args, **options):
+        if options['draws'] < 1:
+            raise CommandError('--draws must be positive')
+        try:
+            rows = run_stability(
+                options['year'], draws=options['draws'], sigma=options['sigma'], seed=options['seed']
+            )
+        except RankingError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Simulated {options['draws']} rankings of {len(rows)} brands for {options['year']}"
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-17 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('brands', '0004_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankStability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(help_text='Ranking year')),
+                ('simulations', models.PositiveIntegerField(help_text='Number of Monte Carlo draws')),
+                ('mean_rank', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('median_rank', models.PositiveIntegerField()),
+                ('rank_low', models.PositiveIntegerField(help_text='5th percentile rank (best plausible)')),
+                ('rank_high', models.PositiveIntegerField(help_text='95th percentile rank (worst plausible)')),
+                ('prob_top_10', models.DecimalField(decimal_places=4, help_text='Share of draws in which the brand ranked in the top 10', max_digits=5)),
+                ('computed_at', models.DateTimeField()),
+                ('brand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rank_stability', to='brands.brand')),
+            ],
+            options={
+                'verbose_name_plural': 'Rank Stability',
+                'ordering': ['year', 'median_rank'],
+                'unique_together': {('brand', 'year')},
+            },
+        ),
+    ]
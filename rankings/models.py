@@ -1,3 +1,27 @@
 from django.db import models
 
-# Create your models here.
+from brands.models import Brand
+
+
+class RankStability(models.Model):
+    """Simulated rank distribution of one brand in one year's ranking."""
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, related_name='rank_stability')
+    year = models.PositiveIntegerField(help_text="Ranking year")
+    simulations = models.PositiveIntegerField(help_text="Number of Monte Carlo draws")
+    mean_rank = models.DecimalField(max_digits=6, decimal_places=2)
+    median_rank = models.PositiveIntegerField()
+    rank_low = models.PositiveIntegerField(help_text="5th percentile rank (best plausible)")
+    rank_high = models.PositiveIntegerField(help_text="95th percentile rank (worst plausible)")
+    prob_top_10 = models.DecimalField(
+        max_digits=5, decimal_places=4,
+        help_text="Share of draws in which the brand ranked in the top 10"
+    )
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['year', 'median_rank']
+        unique_together = ['brand', 'year']
+        verbose_name_plural = "Rank Stability"
+    
+    def __str__(self):
+        return f"{self.brand.title} ({self.year}): {self.rank_low}-{self.rank_high}"
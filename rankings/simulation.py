@@ -0,0 +1,183 @@
+"""
+Monte Carlo rank stability.
+
+Each draw perturbs every brand's ranking inputs with the configured noise,
+re-normalizes, re-scores and re-ranks. Draws are processed in chunks as
+(draws x brands x inputs) arrays, so 10,000 draws of a few hundred brands
+take a handful of matrix operations per chunk. The result is a per-brand
+histogram of simulated ranks, from which intervals and top-10 odds are read.
+
+Noise models, configured per input in the SystemConfiguration key
+STABILITY_NOISE_KEY as {"input": {"model": "relative", "sigma": 0.1}} or
+just {"input": 0.1}:
+
+- relative: multiplicative lognormal noise, sigma is the relative error
+- absolute: additive normal noise, sigma is in the input's own units
+"""
+import json
+import logging
+import math
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import bump_version_on_commit
+from dashboard.models import SystemConfiguration
+
+from .engine import BRAND_INPUTS, RankingError, RankingInputs, get_weights
+from .models import RankStability
+
+
+logger = logging.getLogger(__name__)
+
+STABILITY_NOISE_KEY = 'stability_noise'
+
+# Version stamp namespace of the stored RankStability results
+STABILITY_NAMESPACE = 'stability'
+
+DEFAULT_NOISE = {'model': 'relative', 'sigma': 0.1}
+
+NOISE_MODELS = ('relative', 'absolute')
+
+
+def get_noise(input_names, sigma=None):
+    """Get {input name: (model, sigma)} for the given inputs.
+
+    A sigma argument overrides the configured sigma of every input. A
+    configuration that is not a JSON object is ignored in favour of
+    DEFAULT_NOISE.
+    """
+    raw = SystemConfiguration.get_value(STABILITY_NOISE_KEY)
+    try:
+        configured = json.loads(raw) if raw else {}
+    except ValueError as e:
+        raise RankingError(f'Invalid {STABILITY_NOISE_KEY} configuration: {e}')
+    if not isinstance(configured, dict):
+        logger.warning('%s configuration is not an object; using the default noise', STABILITY_NOISE_KEY)
+        configured = {}
+    noise = {}
+    for name in input_names:
+        spec = configured.get(name, DEFAULT_NOISE)
+        if not isinstance(spec, dict):
+            spec = {'model': DEFAULT_NOISE['model'], 'sigma': spec}
+        model = spec.get('model', DEFAULT_NOISE['model'])
+        if model not in NOISE_MODELS:
+            raise RankingError(f'Unknown noise model "{model}" for "{name}"')
+        value = spec.get('sigma', DEFAULT_NOISE['sigma']) if sigma is None else sigma
+        try:
+            parsed = float(value)
+        except (TypeError, ValueError):
+            parsed = math.nan
+        if not math.isfinite(parsed) or parsed < 0:
+            raise RankingError(f'Invalid noise sigma {value!r} for "{name}"')
+        noise[name] = (model, parsed)
+    return noise
+
+
+def _perturbed_normalized(inputs, noise, draws, rng):
+    """Get (draws, brands, inputs) normalized matrices with noise applied."""
+    raw = inputs.raw
+    n, k = raw.shape
+    values = np.broadcast_to(raw, (draws, n, k)).copy()
+    z = rng.standard_normal((draws, n, k))
+    for column, name in enumerate(inputs.input_names):
+        model, sigma = noise[name]
+        if not sigma:
+            continue
+        if model == 'relative':
+            values[:, :, column] *= np.exp(sigma * z[:, :, column] - sigma * sigma / 2)
+        else:
+            values[:, :, column] += sigma * z[:, :, column]
+
+    log_scale = np.array([BRAND_INPUTS[name][1] if name in BRAND_INPUTS else False for name in inputs.input_names])
+    if log_scale.any():
+        logged = values[:, :, log_scale]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values[:, :, log_scale] = np.where(logged > 0, np.log10(logged), np.nan)
+
+    present = ~np.isnan(values)
+    low = np.where(present, values, np.inf).min(axis=1, keepdims=True)
+    high = np.where(present, values, -np.inf).max(axis=1, keepdims=True)
+    span = high - low
+    span[~np.isfinite(span) | (span == 0)] = 1
+    low[~np.isfinite(low)] = 0
+    return np.nan_to_num((values - low) / span, nan=0.0)
+
+
+# Upper bound on the elements of one chunk's (draws x brands x inputs) array
+CHUNK_ELEMENTS = 2_000_000
+
+
+def simulate(inputs, weights, draws=10000, noise=None, chunk_size=None, seed=None):
+    """Simulate rankings and return a (brands x brands) rank histogram.
+
+    hist[i, r] is the number of draws in which brand i (in inputs order)
+    ranked r + 1.
+    """
+    noise = noise or get_noise(inputs.input_names)
+    rng = np.random.default_rng(seed)
+    vector = inputs.weight_vector(weights)
+    n = len(inputs.ids)
+    hist = np.zeros((n, n), dtype=np.int64)
+    offsets = np.arange(n) * n
+    chunk_size = chunk_size or max(1, CHUNK_ELEMENTS // max(inputs.raw.size, 1))
+    done = 0
+    while done < draws:
+        size = min(chunk_size, draws - done)
+        scores = _perturbed_normalized(inputs, noise, size, rng) @ vector
+        # Inputs are in current rank order, so a stable sort gives ties to
+        # the better current rank, as in the engine
+        order = np.argsort(-scores, axis=1, kind='stable')
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(n), axis=1)
+        hist += np.bincount((ranks + offsets).ravel(), minlength=n * n).reshape(n, n)
+        done += size
+    return hist
+
+
+def summarize(hist, top=10):
+    """Get mean/median rank, a 90% interval and top-N probability per brand."""
+    draws = hist.sum(axis=1, keepdims=True)
+    ranks = np.arange(1, hist.shape[1] + 1)
+    probabilities = hist / draws
+    cumulative = probabilities.cumsum(axis=1)
+
+    def quantile(q):
+        return (cumulative >= q).argmax(axis=1) + 1
+
+    return {
+        'mean_rank': probabilities @ ranks,
+        'median_rank': quantile(0.5),
+        'rank_low': quantile(0.05),
+        'rank_high': quantile(0.95),
+        'prob_top_10': probabilities[:, :top].sum(axis=1),
+    }
+
+
+def run_stability(year, draws=10000, sigma=None, seed=None, weights=None):
+    """Simulate a year's ranking and store the per-brand results."""
+    weights = weights or get_weights()
+    inputs = RankingInputs(year, weights)
+    noise = get_noise(inputs.input_names, sigma=sigma)
+    hist = simulate(inputs, weights, draws=draws, noise=noise, seed=seed)
+    summary = summarize(hist)
+
+    now = timezone.now()
+    rows = [
+        RankStability(
+            brand_id=int(brand_id), year=year, simulations=draws,
+            mean_rank=round(float(summary['mean_rank'][i]), 2),
+            median_rank=int(summary['median_rank'][i]),
+            rank_low=int(summary['rank_low'][i]),
+            rank_high=int(summary['rank_high'][i]),
+            prob_top_10=round(float(summary['prob_top_10'][i]), 4),
+            computed_at=now,
+        )
+        for i, brand_id in enumerate(inputs.ids)
+    ]
+    with transaction.atomic():
+        RankStability.objects.filter(year=year).delete()
+        RankStability.objects.bulk_create(rows, batch_size=500)
+        bump_version_on_commit(STABILITY_NAMESPACE)
+    return rows
@@ -1,3 +1,123 @@
 from django.test import TestCase
 
-# Create your tests here.
+from brands.models import Brand, BrandRanking
+from dashboard.models import SystemConfiguration
+
+from .engine import MAX_RANK, RankingError, rank_year
+from .simulation import DEFAULT_NOISE, STABILITY_NOISE_KEY, get_noise
+
+
+def make_brand(slug, value, rank, year=2025):
+    return Brand.objects.create(
+        title=slug.title(), slug=slug, year=year, description='x', full_description='x',
+        current_rank=rank, brand_value=f'₦{value}B', growth_rate='+1%',
+    )
+
+
+class RankYearTests(TestCase):
+    weights = {'brand_value': 1}
+
+    def setUp(self):
+        # Published ranks are the reverse of brand value
+        self.small = make_brand('small', 10, 1)
+        self.medium = make_brand('medium', 100, 2)
+        self.large = make_brand('large', 1000, 3)
+
+    def test_ranks_by_score(self):
+        results = rank_year(2025, weights=self.weights)
+        self.assertEqual([row['slug'] for row in results], ['large', 'medium', 'small'])
+        self.assertEqual([row['rank'] for row in results], [1, 2, 3])
+        self.assertEqual([row['old_rank'] for row in results], [3, 2, 1])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+
+        ranks = dict(Brand.objects.values_list('slug', 'current_rank'))
+        self.assertEqual(ranks, {'large': 1, 'medium': 2, 'small': 3})
+        snapshot = dict(BrandRanking.objects.filter(year=2025).values_list('brand__slug', 'rank'))
+        self.assertEqual(snapshot, ranks)
+
+    def test_previous_rank_comes_from_last_year(self):
+        make_brand('large', 1000, 7, year=2024)
+        results = {row['slug']: row for row in rank_year(2025, weights=self.weights)}
+        self.assertEqual(results['large']['previous_rank'], 7)
+        self.assertIsNone(results['small']['previous_rank'])
+        self.large.refresh_from_db()
+        self.assertEqual(self.large.previous_rank, 7)
+
+    def test_dry_run_saves_nothing(self):
+        results = rank_year(2025, weights=self.weights, dry_run=True)
+        self.assertEqual(results[0]['slug'], 'large')
+        self.large.refresh_from_db()
+        self.assertEqual(self.large.current_rank, 3)
+        self.assertFalse(BrandRanking.objects.exists())
+
+    def test_ranks_are_capped(self):
+        for i in range(MAX_RANK):
+            make_brand(f'extra-{i}', 2000 + i, MAX_RANK)
+        results = rank_year(2025, weights=self.weights)
+        self.assertEqual(len(results), MAX_RANK + 3)
+        self.assertEqual([row['rank'] for row in results[:MAX_RANK]], list(range(1, MAX_RANK + 1)))
+        self.assertEqual([row['slug'] for row in results[MAX_RANK:]], ['large', 'medium', 'small'])
+        self.assertTrue(all(row['rank'] is None for row in results[MAX_RANK:]))
+
+        # Brands below the cutoff stay published without a rank or snapshot
+        self.assertEqual(Brand.objects.filter(is_published=True).count(), MAX_RANK + 3)
+        self.assertEqual(
+            set(Brand.objects.filter(current_rank__isnull=True).values_list('slug', flat=True)),
+            {'large', 'medium', 'small'},
+        )
+        self.assertEqual(BrandRanking.objects.filter(year=2025).count(), MAX_RANK)
+
+    def test_dropped_brand_re_enters_after_improving(self):
+        for i in range(MAX_RANK):
+            make_brand(f'extra-{i}', 2000 + i, MAX_RANK)
+        rank_year(2025, weights=self.weights)
+        self.small.refresh_from_db()
+        self.assertIsNone(self.small.current_rank)
+
+        self.small.brand_value = '₦9T'
+        self.small.save()
+        results = rank_year(2025, weights=self.weights)
+        self.assertEqual(results[0]['slug'], 'small')
+        self.assertIsNone(results[0]['old_rank'])
+        self.small.refresh_from_db()
+        self.assertEqual(self.small.current_rank, 1)
+        self.assertEqual(BrandRanking.objects.get(brand=self.small, year=2025).rank, 1)
+        # The brand it pushed out loses its rank and snapshot
+        pushed_out = Brand.objects.get(slug='extra-0')
+        self.assertIsNone(pushed_out.current_rank)
+        self.assertFalse(BrandRanking.objects.filter(brand=pushed_out, year=2025).exists())
+        self.assertEqual(BrandRanking.objects.filter(year=2025).count(), MAX_RANK)
+
+    def test_unknown_year_and_bad_weights(self):
+        with self.assertRaises(RankingError):
+            rank_year(1999, weights=self.weights)
+        with self.assertRaises(RankingError):
+            rank_year(2025, weights={'nonsense': 1})
+
+
+class NoiseConfigurationTests(TestCase):
+    def configure(self, value):
+        SystemConfiguration.objects.update_or_create(
+            key=STABILITY_NOISE_KEY, defaults={'value': value, 'is_active': True}
+        )
+
+    def test_per_input_noise(self):
+        self.configure('{"brand_value": {"model": "absolute", "sigma": 2}, "revenue": 0.3}')
+        self.assertEqual(get_noise(['brand_value', 'revenue', 'market_cap']), {
+            'brand_value': ('absolute', 2.0),
+            'revenue': ('relative', 0.3),
+            'market_cap': (DEFAULT_NOISE['model'], DEFAULT_NOISE['sigma']),
+        })
+        self.assertEqual(get_noise(['revenue'], sigma=0.05), {'revenue': ('relative', 0.05)})
+
+    def test_non_object_configuration_falls_back_to_default(self):
+        for value in ['[1, 2]', '0.2', '"relative"', 'null']:
+            self.configure(value)
+            with self.subTest(value=value), self.assertLogs('rankings.simulation', 'WARNING'):
+                self.assertEqual(get_noise(['revenue']), {'revenue': ('relative', DEFAULT_NOISE['sigma'])})
+
+    def test_invalid_noise_raises_ranking_error(self):
+        for value in ['{not json', '{"revenue": {"model": "wild"}}', '{"revenue": "abc"}', '{"revenue": -1}']:
+            self.configure(value)
+            with self.subTest(value=value), self.assertRaises(RankingError):
+                get_noise(['revenue'])
@@ -53,7 +53,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'dashboard.middleware.SessionMiddleware',  # Session middleware without per-request saves for the dashboard API
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -211,13 +211,59 @@ LOGGING = {
     },
 }
 
-# Cache configuration (simple for development)
+# Cache configuration - a SQLite file shared by every worker process on the host
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
     }
 }
 
+# Upper bound on how long a cached public API response is served. Content
+# writes invalidate responses immediately; this only limits how stale the
+# engagement counters shown in them can get.
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=600, cast=int)
+
+# SQLite file buffering view/download counter increments between flushes
+COUNTER_DATABASE = config('COUNTER_DATABASE', default=str(BASE_DIR / 'counters.sqlite3'))
+
+# How often buffered view/download counters are written to the database
+COUNTER_FLUSH_INTERVAL = config('COUNTER_FLUSH_INTERVAL', default=30, cast=int)
+
+# Run tests against a temporary cache and counter database
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Engagement events: SQLite file spooling beacon events until the rollup job
+# moves them into the database
+ANALYTICS_SPOOL = config('ANALYTICS_SPOOL', default=str(BASE_DIR / 'events.sqlite3'))
+ANALYTICS_MAX_BATCH = config('ANALYTICS_MAX_BATCH', default=100, cast=int)
+# Raw events older than this are pruned once rolled up; must cover the
+# longest stats window (30 days).
+ANALYTICS_RETENTION_DAYS = config('ANALYTICS_RETENTION_DAYS', default=35, cast=int)
+
+# A view's weight in trending scores halves every this many hours
+TRENDING_HALF_LIFE_HOURS = config('TRENDING_HALF_LIFE_HOURS', default=48, cast=float)
+
+# Background jobs (see dashboard.jobs and the run_jobs command)
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+# Seconds before the first retry; doubles on each further attempt
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)
+JOB_HEARTBEAT_INTERVAL = config('JOB_HEARTBEAT_INTERVAL', default=10, cast=int)
+# A running job whose worker has not heartbeated for this long is requeued
+JOB_STALE_AFTER = config('JOB_STALE_AFTER', default=120, cast=int)
+
+# Dashboard bearer tokens (see dashboard.authentication)
+DASHBOARD_TOKEN_MAX_AGE = config('DASHBOARD_TOKEN_MAX_AGE', default=86400, cast=int)
+# How long each worker trusts a cached user before re-reading it
+DASHBOARD_USER_CACHE_SECONDS = config('DASHBOARD_USER_CACHE_SECONDS', default=60, cast=int)
+
+# Backups (see dashboard.backup); rows are read this many at a time
+BACKUP_ROOT = config('BACKUP_ROOT', default=str(BASE_DIR / 'backups'))
+BACKUP_CHUNK_SIZE = config('BACKUP_CHUNK_SIZE', default=1000, cast=int)
+
 # Authentication settings
 LOGIN_URL = '/api/dashboard/auth/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'